@@ -0,0 +1,257 @@
+"""Columnar copy of Race_Data for aggregate statistics.
+
+Race_Data is loaded once per f1db file into NumPy arrays: driver,
+constructor and engine manufacturer ids are dictionary encoded, positions
+and *_millis fields are int32 (MISSING for NULL). Aggregations are then a
+mask and a bincount instead of a join over the whole table.
+"""
+
+import numpy as np
+from sqlmodel import Session, select
+
+from app.cache import DerivedCache
+from app.models.f1 import Race, Race_Data
+
+MISSING = -1
+
+ENTITIES = ("driver", "constructor", "engine_manufacturer")
+
+RACE_RESULT = "RACE_RESULT"
+SPRINT_RACE_RESULT = "SPRINT_RACE_RESULT"
+QUALIFYING_RESULT = "QUALIFYING_RESULT"
+
+MILLIS_COLUMNS = tuple(
+    column.name
+    for column in Race_Data.__table__.columns
+    if column.name.endswith("_millis")
+)
+
+CHUNK_ROWS = 50_000
+
+MAX_LIMIT = 1_000
+
+DTYPES = {
+    "year": np.int16,
+    "race_id": np.int32,
+    "type": np.int8,
+    "driver": np.int32,
+    "constructor": np.int32,
+    "engine_manufacturer": np.int32,
+    "position": np.int32,
+    "points": np.float32,
+    "fastest_lap": np.bool_,
+    **{name: np.int32 for name in MILLIS_COLUMNS},
+}
+
+
+class Dictionary:
+    """Maps ids to dense int32 codes in order of appearance."""
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def encode(self, values):
+        codes = self.codes
+        encoded = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            code = codes.get(value)
+            if code is None:
+                code = codes[value] = len(self.values)
+                self.values.append(value)
+            encoded[i] = code
+        return encoded
+
+    def __len__(self):
+        return len(self.values)
+
+
+def _int32(values):
+    return np.array(
+        [MISSING if value is None else value for value in values], dtype=np.int32
+    )
+
+
+class RaceDataColumns:
+    def __init__(self, columns, dictionaries):
+        self.year = columns["year"]
+        self.race_id = columns["race_id"]
+        self.type = columns["type"]
+        self.driver = columns["driver"]
+        self.constructor = columns["constructor"]
+        self.engine_manufacturer = columns["engine_manufacturer"]
+        self.position = columns["position"]
+        self.points = columns["points"]
+        self.fastest_lap = columns["fastest_lap"]
+        self.millis = {name: columns[name] for name in MILLIS_COLUMNS}
+        self.dictionaries = dictionaries
+
+    def __len__(self):
+        return len(self.race_id)
+
+    @property
+    def nbytes(self):
+        arrays = [
+            self.year,
+            self.race_id,
+            self.type,
+            self.driver,
+            self.constructor,
+            self.engine_manufacturer,
+            self.position,
+            self.points,
+            self.fastest_lap,
+            *self.millis.values(),
+        ]
+        return sum(array.nbytes for array in arrays)
+
+    def type_mask(self, *types):
+        codes = [
+            self.dictionaries["type"].codes[name]
+            for name in types
+            if name in self.dictionaries["type"].codes
+        ]
+        return np.isin(self.type, codes)
+
+    def year_mask(self, year_from=None, year_to=None):
+        mask = np.ones(len(self), dtype=bool)
+        if year_from is not None:
+            mask &= self.year >= year_from
+        if year_to is not None:
+            mask &= self.year <= year_to
+        return mask
+
+
+def race_data_query():
+    return (
+        select(
+            Race.year,
+            Race_Data.race_id,
+            Race_Data.type,
+            Race_Data.driver_id,
+            Race_Data.constructor_id,
+            Race_Data.engine_manufacturer_id,
+            Race_Data.position_number,
+            Race_Data.race_points,
+            Race_Data.race_fastest_lap,
+            *(getattr(Race_Data, name) for name in MILLIS_COLUMNS),
+        )
+        .join(Race, Race.id == Race_Data.race_id)
+        .execution_options(yield_per=CHUNK_ROWS)
+    )
+
+
+def load_race_data(db: Session) -> RaceDataColumns:
+    dictionaries = {name: Dictionary() for name in ("type", *ENTITIES)}
+    chunks = []
+    result = db.connection().execute(race_data_query())
+    for rows in result.partitions():
+        (
+            year,
+            race_id,
+            types,
+            driver,
+            constructor,
+            engine_manufacturer,
+            position,
+            points,
+            fastest_lap,
+            *millis,
+        ) = zip(*rows)
+        chunk = {
+            "year": np.array(year, dtype=np.int16),
+            "race_id": np.array(race_id, dtype=np.int32),
+            "type": dictionaries["type"].encode(types).astype(np.int8),
+            "driver": dictionaries["driver"].encode(driver),
+            "constructor": dictionaries["constructor"].encode(constructor),
+            "engine_manufacturer": dictionaries["engine_manufacturer"].encode(
+                engine_manufacturer
+            ),
+            "position": _int32(position),
+            "points": np.array([value or 0 for value in points], dtype=np.float32),
+            "fastest_lap": np.array([bool(value) for value in fastest_lap]),
+        }
+        chunk.update(zip(MILLIS_COLUMNS, map(_int32, millis)))
+        chunks.append(chunk)
+
+    columns = {
+        name: np.concatenate([chunk[name] for chunk in chunks] or [np.empty(0, dtype)])
+        for name, dtype in DTYPES.items()
+    }
+    return RaceDataColumns(columns, dictionaries)
+
+
+# statistic -> (row mask, value per row)
+def _wins(columns):
+    return columns.type_mask(RACE_RESULT) & (columns.position == 1), None
+
+
+def _podiums(columns):
+    mask = columns.type_mask(RACE_RESULT)
+    return mask & (columns.position >= 1) & (columns.position <= 3), None
+
+
+def _points(columns):
+    return columns.type_mask(RACE_RESULT, SPRINT_RACE_RESULT), columns.points
+
+
+def _fastest_laps(columns):
+    return columns.type_mask(RACE_RESULT) & columns.fastest_lap, None
+
+
+def _pole_positions(columns):
+    return columns.type_mask(QUALIFYING_RESULT) & (columns.position == 1), None
+
+
+STATISTICS = {
+    "wins": _wins,
+    "podiums": _podiums,
+    "points": _points,
+    "fastest_laps": _fastest_laps,
+    "pole_positions": _pole_positions,
+}
+
+
+def aggregate(
+    columns: RaceDataColumns,
+    statistic: str,
+    by: str = "driver",
+    year_from: int | None = None,
+    year_to: int | None = None,
+    limit: int | None = None,
+):
+    """[(id, value)] of `statistic` per `by` entity, highest first."""
+    if limit is not None:
+        # a negative slice end would drop the last entities instead
+        limit = max(1, min(limit, MAX_LIMIT))
+    mask, values = STATISTICS[statistic](columns)
+    mask &= columns.year_mask(year_from, year_to)
+    dictionary = columns.dictionaries[by]
+    entities = getattr(columns, by)[mask]
+    if values is None and by != "driver":
+        # a shared car has a row per driver with the same race and position,
+        # but is one result for its constructor and engine manufacturer
+        results = (
+            (columns.race_id[mask].astype(np.int64) << 32)
+            | ((columns.position[mask].astype(np.int64) & 0xFF) << 24)
+            | entities
+        )
+        entities = (np.unique(results) & 0xFFFFFF).astype(np.int32)
+    totals = np.bincount(
+        entities,
+        weights=None if values is None else values[mask],
+        minlength=len(dictionary),
+    )
+    # stable, so ties keep the order ids first appear in f1db
+    order = np.argsort(-totals, kind="stable")
+    order = order[totals[order] > 0][:limit]
+    if values is None:
+        totals = totals.astype(np.int64)
+    return [(dictionary.values[code], totals[code].item()) for code in order]
+
+
+race_data_cache = DerivedCache(
+    load_race_data,
+    lambda columns: f"Loaded {len(columns)} Race_Data rows into columns "
+    f"({columns.nbytes / 1024 / 1024:.1f} MiB)",
+)
@@ -0,0 +1,206 @@
+"""Versioned JSON API over the f1db tables, under /api/v1.
+
+Rows are read as plain tuples and encoded in one call with orjson (the
+json module when orjson is not installed), without a pydantic model per
+row. Per-season collections are cached and served like the HTML
+fragments (ETag, gzip/brotli). Race_Data is paged with a keyset cursor on
+its primary key, so every page is one index range scan however deep it is.
+"""
+
+import base64
+import binascii
+import datetime
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import tuple_
+from sqlmodel import Session, select
+
+from app.cache import fragment_cache, fragment_response
+from app.database import db_version, get_db
+from app.models.f1 import (
+    Race,
+    Race_Data,
+    Season,
+    Season_Constructor_Standing,
+    Season_Driver_Standing,
+)
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, json is always available
+    orjson = None
+
+MAX_LIMIT = 10_000
+
+RACE_DATA_KEY = (
+    Race_Data.race_id,
+    Race_Data.type,
+    Race_Data.position_display_order,
+)
+
+
+def _default(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(
+        value, default=_default, ensure_ascii=False, separators=(",", ":")
+    ).encode()
+
+
+class JSONBytesResponse(Response):
+    media_type = "application/json"
+
+
+def records(db: Session, query):
+    result = db.connection().execute(query)
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result]
+
+
+def table_query(model):
+    # the columns, not the entity: rows stay tuples
+    return select(*model.__table__.columns)
+
+
+def cached_json(request: Request, key, build):
+    version = db_version()
+    entry = fragment_cache.get(key, version)
+    if entry is None:
+        entry = fragment_cache.put(key, version, dumps(build()))
+    return fragment_response(request, entry, media_type="application/json")
+
+
+def encode_cursor(row) -> str:
+    key = [row[column.name] for column in RACE_DATA_KEY]
+    return base64.urlsafe_b64encode(dumps(key)).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        key = None
+    # exact types: a float, bool or null would compare with the key columns
+    # under SQLite's type ordering instead of failing
+    if not isinstance(key, list) or [type(value) for value in key] != [int, str, int]:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    race_id, type_, position_display_order = key
+    return race_id, type_, position_display_order
+
+
+def race_data_page_query(
+    after=None, limit=1000, year_from=None, year_to=None, type=None
+):
+    query = table_query(Race_Data).order_by(*RACE_DATA_KEY).limit(limit)
+    if after is not None:
+        query = query.where(tuple_(*RACE_DATA_KEY) > tuple_(*after))
+    if year_from is not None or year_to is not None:
+        races = select(Race.id)
+        if year_from is not None:
+            races = races.where(Race.year >= year_from)
+        if year_to is not None:
+            races = races.where(Race.year <= year_to)
+        if after is not None:
+            # skip the races of earlier pages instead of probing each of them
+            races = races.where(Race.id >= after[0])
+        query = query.where(Race_Data.race_id.in_(races))
+    if type is not None:
+        query = query.where(Race_Data.type == type)
+    return query
+
+
+router = APIRouter(prefix="/api/v1")
+
+
+@router.get("/seasons")
+def read_seasons(request: Request, db: Session = Depends(get_db)):
+    return cached_json(
+        request,
+        ("v1", "seasons"),
+        lambda: records(db, table_query(Season).order_by(Season.year)),
+    )
+
+
+@router.get("/seasons/{year}/races")
+def read_season_races(request: Request, year: int, db: Session = Depends(get_db)):
+    return cached_json(
+        request,
+        ("v1", "races", year),
+        lambda: records(
+            db, table_query(Race).where(Race.year == year).order_by(Race.round)
+        ),
+    )
+
+
+STANDINGS = {
+    "drivers": Season_Driver_Standing,
+    "constructors": Season_Constructor_Standing,
+}
+
+
+@router.get("/seasons/{year}/standings/{kind}")
+def read_season_standings(
+    request: Request, year: int, kind: str, db: Session = Depends(get_db)
+):
+    model = STANDINGS.get(kind)
+    if model is None:
+        raise HTTPException(status_code=404)
+    return cached_json(
+        request,
+        ("v1", "standings", year, kind),
+        lambda: records(
+            db,
+            table_query(model)
+            .where(model.year == year)
+            .order_by(model.position_display_order),
+        ),
+    )
+
+
+@router.get("/races/{race_id}/results")
+def read_race_results(
+    request: Request,
+    race_id: int,
+    type: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    def build():
+        query = (
+            table_query(Race_Data)
+            .where(Race_Data.race_id == race_id)
+            .order_by(*RACE_DATA_KEY)
+        )
+        if type is not None:
+            query = query.where(Race_Data.type == type)
+        return records(db, query)
+
+    return cached_json(request, ("v1", "results", race_id, type), build)
+
+
+@router.get("/race-data")
+def read_race_data(
+    cursor: Optional[str] = None,
+    limit: int = 1000,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    type: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """One page of Race_Data in primary key order; `next` is the next cursor."""
+    limit = max(1, min(limit, MAX_LIMIT))
+    after = None if cursor is None else decode_cursor(cursor)
+    # one extra row tells whether there is a next page
+    rows = records(db, race_data_page_query(after, limit + 1, year_from, year_to, type))
+    next = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next = encode_cursor(rows[-1])
+    return JSONBytesResponse(dumps({"data": rows, "next": next}))
@@ -0,0 +1,205 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import Request, Response
+
+from app import config
+from app import timing
+from app.database import db_version
+from app.compression import available_encodings, negotiate
+from app.compression import compress as compress_bytes
+
+
+class CachedFragment:
+    """Rendered bytes, plus their compressed variants when compress=True.
+
+    Compressing once when the entry is created means cache hits only copy
+    bytes, whatever the client's Accept-Encoding.
+    """
+
+    def __init__(self, body: bytes, compress=False, fast=True):
+        self.body = body
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        self.variants = {}
+        if compress and len(body) >= config.COMPRESS_MIN_BYTES:
+            self.variants = {
+                encoding: compress_bytes(body, encoding, fast)
+                for encoding in available_encodings()
+            }
+
+    def __len__(self):
+        return len(self.body) + sum(len(body) for body in self.variants.values())
+
+    def etag_for(self, encoding: str | None):
+        # a strong ETag identifies the bytes on the wire, so one per encoding
+        if encoding is None:
+            return self.etag
+        return f'{self.etag[:-1]}-{encoding}"'
+
+
+class CompiledPage(CachedFragment):
+    """A whole page kept in memory, compressed as small as possible."""
+
+    def __init__(self, body: bytes):
+        super().__init__(body, compress=True, fast=False)
+
+
+class FragmentCache:
+    """LRU of rendered fragments, bounded by entry count and total bytes.
+
+    Every entry belongs to one f1db version; asking for a different version
+    (a new release was dropped into datastore/) empties the cache.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, compress=False):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+
+    def _check_version(self, version):
+        if version != self._version:
+            self._entries.clear()
+            self._bytes = 0
+            self._version = version
+
+    def get(self, key, version):
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, version, body: bytes) -> CachedFragment:
+        entry = CachedFragment(body, self.compress)
+        with self._lock:
+            self._check_version(version)
+            if len(entry) > self.max_bytes:
+                return entry
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = entry
+            self._bytes += len(entry)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+        return entry
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._version = None
+
+    def counters(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+        }
+
+
+fragment_cache = FragmentCache(
+    config.FRAGMENT_CACHE_ENTRIES, config.FRAGMENT_CACHE_BYTES, config.COMPRESS
+)
+
+
+class DerivedCache:
+    """One value derived from the f1db file, built once per f1db version.
+
+    `build(db)` runs under a lock, so concurrent first requests build it
+    once. With `report`, building prints report(value) and the time taken.
+    """
+
+    def __init__(self, build, report=None):
+        self.build = build
+        self.report = report
+        self._lock = threading.Lock()
+        self._cached = None  # (db version, value)
+        self.hits = 0
+        self.misses = 0
+
+    def current(self):
+        """The value if it matches the f1db file, without touching the db."""
+        cached = self._cached
+        if cached is not None and cached[0] == db_version():
+            self.hits += 1
+            return cached[1]
+        return None
+
+    def get(self, db):
+        value = self.current()
+        if value is not None:
+            return value
+        with self._lock:
+            # another request may have built it while we waited
+            value = self.current()
+            if value is not None:
+                return value
+            self.misses += 1
+            version = db_version()
+            started = time.perf_counter()
+            value = self.build(db)
+            self._cached = (version, value)
+            if self.report is not None:
+                print(f"{self.report(value)} in {time.perf_counter() - started:.2f}s")
+            return value
+
+    def put(self, value):
+        """Store a value built elsewhere (e.g. from async queries)."""
+        self._cached = (db_version(), value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._cached = None
+
+    def counters(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def etag_matches(request: Request, etag: str):
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates
+
+
+def fragment_headers(etag: str | None = None):
+    headers = {"Cache-Control": f"public, max-age={config.FRAGMENT_MAX_AGE}"}
+    if etag is not None:
+        headers["ETag"] = etag
+    return headers
+
+
+def fragment_response(request: Request, entry: CachedFragment, media_type="text/html"):
+    encoding = negotiate(request.headers.get("accept-encoding"), list(entry.variants))
+    etag = entry.etag_for(encoding)
+    headers = fragment_headers(etag)
+    if entry.variants:
+        headers["Vary"] = "Accept-Encoding"
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    body = entry.body
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+        body = entry.variants[encoding]
+    timing.record_identity_bytes(len(entry.body))
+    return Response(body, media_type=media_type, headers=headers)
@@ -0,0 +1,130 @@
+import hashlib
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import pygal
+
+from app import config, timing
+from app.cache import FragmentCache
+
+
+class ChartSpec(NamedTuple):
+    """Everything needed to draw a chart; hashable and picklable."""
+
+    title: str
+    x_title: str
+    y_title: str | None
+    x_labels: tuple
+    series: tuple  # ((name, (value, ...)), ...)
+    width: int = 900
+    height: int = 600
+    kind: str = "bar"  # or "line"
+
+    def key(self):
+        return hashlib.sha1(repr(self).encode()).hexdigest()
+
+
+def bar_chart(title, x_title, y_title, x_labels, series, width=900, height=600):
+    return ChartSpec(
+        title,
+        x_title,
+        y_title,
+        tuple(str(label) for label in x_labels),
+        tuple((name, tuple(values)) for name, values in series),
+        width,
+        height,
+    )
+
+
+def line_chart(title, x_title, y_title, x_labels, series, width=900, height=600):
+    return bar_chart(title, x_title, y_title, x_labels, series, width, height)._replace(
+        kind="line"
+    )
+
+
+# pygal gives every chart a random uuid and stamps the render date; both are
+# replaced so the SVG, and with it the ETag, only depends on the spec
+CHART_ID = re.compile(r'id="chart-([0-9a-f-]{36})"')
+RENDER_DATE = re.compile(r" on \d{4}-\d{2}-\d{2}(?=-->)")
+
+
+def render_chart(spec: ChartSpec) -> str:
+    chart_type = pygal.Line if spec.kind == "line" else pygal.Bar
+    chart = chart_type(
+        x_label_rotation=40, width=spec.width, height=spec.height, explicit_size=True
+    )
+    chart.title = spec.title
+    chart.x_title = spec.x_title
+    if spec.y_title is not None:
+        chart.y_title = spec.y_title
+    chart.x_labels = list(spec.x_labels)
+    for name, values in spec.series:
+        chart.add(name, list(values))
+    svg = chart.render().decode("utf-8")
+    chart_id = CHART_ID.search(svg)
+    if chart_id is not None:
+        svg = svg.replace(chart_id.group(1), spec.key()[:32])
+    return RENDER_DATE.sub("", svg, count=1)
+
+
+class ChartRenderer:
+    """Renders charts in a process pool, caching the SVG by chart input.
+
+    Without a pool (not started, or F1STATS_CHART_WORKERS=0) charts are
+    rendered in the calling thread.
+    """
+
+    def __init__(self, cache: FragmentCache):
+        self.cache = cache
+        self._pool = None
+
+    def start(self, workers: int):
+        if workers > 0 and self._pool is None:
+            # the server is multi-threaded by now, so workers must not be
+            # forked from it; start them all here instead of on first render
+            self._pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+            warm_up = bar_chart("", "", None, ("",), (("", (0,)),))
+            for future in [
+                self._pool.submit(render_chart, warm_up) for _ in range(workers)
+            ]:
+                future.result()
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def render_many(self, specs: dict) -> dict:
+        with timing.stage("chart"):
+            return self._render_many(specs)
+
+    def _render_many(self, specs: dict) -> dict:
+        svgs = {}
+        pending = {}
+        for name, spec in specs.items():
+            entry = self.cache.get(spec.key(), None)
+            if entry is not None:
+                svgs[name] = entry.body.decode("utf-8")
+            elif self._pool is not None:
+                pending[name] = self._pool.submit(render_chart, spec)
+            else:
+                svgs[name] = self._store(spec, render_chart(spec))
+        for name, future in pending.items():
+            svgs[name] = self._store(specs[name], future.result())
+        return svgs
+
+    def render(self, spec: ChartSpec) -> str:
+        return self.render_many({"chart": spec})["chart"]
+
+    def _store(self, spec: ChartSpec, svg: str):
+        self.cache.put(spec.key(), None, svg.encode("utf-8"))
+        return svg
+
+
+chart_cache = FragmentCache(config.CHART_CACHE_ENTRIES, config.CHART_CACHE_BYTES)
+chart_renderer = ChartRenderer(chart_cache)
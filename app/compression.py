@@ -0,0 +1,57 @@
+import gzip
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+
+def gzip_bytes(body: bytes, fast=False) -> bytes:
+    # mtime=0 keeps the output byte-identical between runs
+    return gzip.compress(body, compresslevel=6 if fast else 9, mtime=0)
+
+
+def brotli_bytes(body: bytes, fast=False) -> bytes:
+    # quality 11 is for files written once; 5 is as small as gzip -9 and
+    # fast enough to run on a cache miss
+    return brotli.compress(body, quality=5 if fast else 11)
+
+
+def available_encodings():
+    if brotli is not None:
+        return ("br", "gzip")
+    return ("gzip",)
+
+
+def compress(body: bytes, encoding: str, fast=False) -> bytes:
+    if encoding == "br":
+        return brotli_bytes(body, fast)
+    if encoding == "gzip":
+        return gzip_bytes(body, fast)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def negotiate(accept_encoding: str | None, offered=None):
+    """Pick the best encoding from `offered` allowed by an Accept-Encoding header."""
+    if not accept_encoding:
+        return None
+    if offered is None:
+        offered = available_encodings()
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    best = None
+    best_quality = 0.0
+    for encoding in offered:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
@@ -0,0 +1,75 @@
+import os
+
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def env_bool(name, default=False):
+    value = os.environ.get(name)
+    if not value:
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+# the f1db SQLite file, opened read-only
+DB_PATH = os.environ.get("F1STATS_DB_PATH", "datastore/f1db.db")
+# copy of DB_PATH with covering indexes, built by `python -m app.indexadvisor`
+DB_INDEXED_PATH = os.environ.get("F1STATS_DB_INDEXED_PATH", "datastore/f1db-indexed.db")
+USE_INDEXED_DB = env_bool("F1STATS_USE_INDEXED_DB")
+# per-season summary tables derived from DB_PATH, see app/summary.py
+SUMMARY_DB_PATH = os.environ.get(
+    "F1STATS_SUMMARY_DB_PATH", "datastore/f1stats-summary.db"
+)
+USE_SUMMARY_DB = env_bool("F1STATS_USE_SUMMARY_DB")
+# connections kept open; the sync endpoints run in a threadpool of 40 threads
+DB_POOL_SIZE = env_int("F1STATS_DB_POOL_SIZE", 40)
+DB_POOL_OVERFLOW = env_int("F1STATS_DB_POOL_OVERFLOW", 10)
+DB_MMAP_SIZE = env_int("F1STATS_DB_MMAP_SIZE", 256 * 1024 * 1024)
+# page cache per connection, in KiB
+DB_CACHE_KIB = env_int("F1STATS_DB_CACHE_KIB", 16 * 1024)
+SQL_ECHO = env_bool("F1STATS_SQL_ECHO")
+# copy the f1db file into memory at startup, unless it is larger than this
+DB_IN_MEMORY = env_bool("F1STATS_DB_IN_MEMORY")
+DB_IN_MEMORY_MAX_BYTES = env_int("F1STATS_DB_IN_MEMORY_MAX_BYTES", 512 * 1024 * 1024)
+
+# rendered /api/season fragments kept in memory
+FRAGMENT_CACHE_ENTRIES = env_int("F1STATS_FRAGMENT_CACHE_ENTRIES", 128)
+FRAGMENT_CACHE_BYTES = env_int("F1STATS_FRAGMENT_CACHE_BYTES", 64 * 1024 * 1024)
+# Cache-Control max-age for fragments (browsers and CDN)
+FRAGMENT_MAX_AGE = env_int("F1STATS_FRAGMENT_MAX_AGE", 3600)
+
+# gzip/brotli variants stored with every cached fragment
+COMPRESS = env_bool("F1STATS_COMPRESS", True)
+COMPRESS_MIN_BYTES = env_int("F1STATS_COMPRESS_MIN_BYTES", 512)
+
+# serve pages written by `python -m app.prerender` when they match the f1db file
+PRERENDERED = env_bool("F1STATS_PRERENDERED")
+PRERENDER_DIR = os.environ.get("F1STATS_PRERENDER_DIR", "static/prerendered")
+
+# finished Race_Data exports, kept per f1db release
+EXPORT_DIR = os.environ.get("F1STATS_EXPORT_DIR", "datastore/exports")
+EXPORT_CHUNK_ROWS = env_int("F1STATS_EXPORT_CHUNK_ROWS", 10_000)
+
+# Server-Timing headers and the /metrics histograms
+TIMING = env_bool("F1STATS_TIMING", True)
+
+# admin-only sampling profiler and ?profile=1, guarded by the bearer token
+PROFILING = env_bool("F1STATS_PROFILING")
+ADMIN_TOKEN = os.environ.get("F1STATS_ADMIN_TOKEN", "")
+
+# "sync" runs the endpoints in the threadpool, "async" uses aiosqlite
+DB_MODE = os.environ.get("F1STATS_DB_MODE", "sync")
+
+# processes rendering pygal charts in parallel (0 renders in the request thread)
+CHART_WORKERS = env_int("F1STATS_CHART_WORKERS", min(5, os.cpu_count() or 1))
+CHART_CACHE_ENTRIES = env_int("F1STATS_CHART_CACHE_ENTRIES", 512)
+CHART_CACHE_BYTES = env_int("F1STATS_CHART_CACHE_BYTES", 128 * 1024 * 1024)
+
+# leave charts and all-years tables out of /api/season and let htmx load them
+# from their own fragment endpoints when they scroll into view
+LAZY_FRAGMENTS = env_bool("F1STATS_LAZY_FRAGMENTS", True)
+
+# stream /api/season section by section on cache misses
+STREAM_SEASON = env_bool("F1STATS_STREAM_SEASON")
@@ -1,22 +1,197 @@
+import hashlib
+import os
+import sqlite3
+import time
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app import config, timing
+
+
+def sqlite_uri(path):
+    # immutable=1: the f1db file never changes while it is open, so SQLite
+    # can skip locking and change detection entirely
+    return f"file:{os.path.abspath(path)}?mode=ro&immutable=1"
+
+
+def file_identity(path):
+    # The f1db file is only replaced between releases, so path + mtime + size
+    # is enough to tell whether anything derived from it is still valid.
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+def file_version(path):
+    return hashlib.sha1(repr(file_identity(path)).encode()).hexdigest()[:16]
+
+
+def derived_source_version(path, table):
+    """source_version recorded in a derived database (sidecar, summary store)."""
+    try:
+        connection = sqlite3.connect(sqlite_uri(path), uri=True)
+        try:
+            row = connection.execute(
+                f"SELECT value FROM {table} WHERE key = 'source_version'"
+            ).fetchone()
+        finally:
+            connection.close()
+    except sqlite3.Error:
+        return None
+    return row[0] if row else None
+
+
+def resolve_db_path():
+    if not config.USE_INDEXED_DB:
+        return config.DB_PATH
+    if os.path.exists(config.DB_INDEXED_PATH) and derived_source_version(
+        config.DB_INDEXED_PATH, "f1stats_sidecar"
+    ) == file_version(config.DB_PATH):
+        return config.DB_INDEXED_PATH
+    print(
+        f"{config.DB_INDEXED_PATH} is missing or was built from another f1db "
+        f"file, using {config.DB_PATH}"
+    )
+    return config.DB_PATH
+
+
+sqlite_file_path = resolve_db_path()
+
+
+# shared-cache in-memory copy of the f1db file, see load_into_memory()
+memory_uri = "file:f1db?mode=memory&cache=shared"
+
+sqlite_url = f"sqlite:///{sqlite_uri(sqlite_file_path)}&uri=true"
+async_sqlite_url = f"sqlite+aiosqlite:///{sqlite_uri(sqlite_file_path)}&uri=true"
+
+connect_args = {"check_same_thread": False}  # special case for SQLite
+
+
+def set_read_only_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA mmap_size = {config.DB_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size = -{config.DB_CACHE_KIB}")
+    cursor.execute("PRAGMA temp_store = memory")
+    cursor.execute("PRAGMA query_only = 1")
+    cursor.close()
+
+
+def make_engine(url):
+    engine = create_engine(
+        url,
+        echo=config.SQL_ECHO,
+        connect_args=connect_args,
+        poolclass=QueuePool,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_POOL_OVERFLOW,
+    )
+    event.listen(engine, "connect", set_read_only_pragmas)
+    event.listen(engine, "before_cursor_execute", timing.before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", timing.after_cursor_execute)
+    return engine
+
+
+def make_async_engine(url):
+    async_engine = create_async_engine(
+        url,
+        echo=config.SQL_ECHO,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_POOL_OVERFLOW,
+    )
+    sync_engine = async_engine.sync_engine
+    event.listen(sync_engine, "connect", set_read_only_pragmas)
+    event.listen(sync_engine, "before_cursor_execute", timing.before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", timing.after_cursor_execute)
+    return async_engine
+
+
+engine = make_engine(sqlite_url)
+async_engine = make_async_engine(async_sqlite_url)
 
-sqlite_file_name = "datastore/f1db.db?mode=ro"
-sqlite_url = f"sqlite:///{sqlite_file_name}"
 
-connect_args = {
-    "check_same_thread": False,
-    "isolation_level": "IMMEDIATE",
-}  # special case for SQLite
-engine = create_engine(sqlite_url, echo=True, connect_args=connect_args)
+_memory_anchor = None
+_memory_identity = None
 
-# !!!!!! Not really needed as the database is read-only
-# checkout tips: https://www.powersync.com/blog/sqlite-optimizations-for-ultra-high-performance
-# with Session(engine) as session:
-#     session.exec(text("PRAGMA journal_mode = WAL"))
-#     session.exec(text("PRAGMA synchronous = normal"))
-#     session.exec(text("PRAGMA foreign_keys = on"))
-#     session.exec(text("PRAGMA journal_size_limit = 6144000"))
-#     session.commit()
+
+def available_memory():
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def load_into_memory():
+    """Copy the f1db file into a shared in-memory database and use it.
+
+    Returns False (and keeps using the file) when the copy would not fit.
+    """
+    global engine, async_engine, _memory_anchor, _memory_identity
+
+    file_size = os.path.getsize(sqlite_file_path)
+    available = available_memory()
+    if file_size > config.DB_IN_MEMORY_MAX_BYTES or (
+        available is not None and file_size * 2 > available
+    ):
+        print(
+            f"Not loading f1db into memory ({file_size} bytes, "
+            f"{available} available), using {sqlite_file_path}"
+        )
+        return False
+
+    started = time.perf_counter()
+    identity = db_identity()
+    # the shared in-memory database lives as long as one connection to it
+    anchor = sqlite3.connect(memory_uri, uri=True, check_same_thread=False)
+    try:
+        source = sqlite3.connect(sqlite_uri(sqlite_file_path), uri=True)
+        try:
+            source.backup(anchor)
+        finally:
+            source.close()
+    except (sqlite3.Error, MemoryError) as e:
+        anchor.close()
+        print(f"Loading f1db into memory failed ({e}), using {sqlite_file_path}")
+        return False
+    page_count = anchor.execute("PRAGMA page_count").fetchone()[0]
+    page_size = anchor.execute("PRAGMA page_size").fetchone()[0]
+
+    engine.dispose()
+    async_engine.sync_engine.dispose(close=False)
+    engine = make_engine(f"sqlite:///{memory_uri}&uri=true")
+    async_engine = make_async_engine(f"sqlite+aiosqlite:///{memory_uri}&uri=true")
+    _memory_anchor = anchor
+    # derived caches stay keyed to the file that was loaded
+    _memory_identity = identity
+    print(
+        f"Loaded f1db into memory in {time.perf_counter() - started:.2f}s "
+        f"({page_count * page_size / 1024 / 1024:.1f} MiB)"
+    )
+    return True
+
+
+def db_identity():
+    if _memory_identity is not None:
+        return _memory_identity
+    return file_identity(sqlite_file_path)
+
+
+_last_identity = None
+
+
+def db_version():
+    global _last_identity
+    identity = db_identity()
+    if identity != _last_identity:
+        # immutable connections would keep reading a replaced file
+        if _last_identity is not None:
+            engine.dispose()
+            async_engine.sync_engine.dispose(close=False)
+        _last_identity = identity
+    return hashlib.sha1(repr(identity).encode()).hexdigest()[:16]
 
 
 def create_db_and_tables():
@@ -24,11 +199,24 @@ def create_db_and_tables():
 
 
 def close_db():
+    global _memory_anchor, _memory_identity
     engine.dispose()
+    if _memory_anchor is not None:
+        _memory_anchor.close()
+        _memory_anchor = None
+        _memory_identity = None
+
+
+async def close_async_db():
+    await async_engine.dispose()
+
+
+def open_db():
+    return Session(autoflush=False, bind=engine)
 
 
 def get_db():
-    db = Session(autoflush=False, bind=engine)
+    db = open_db()
     try:
         yield db
     finally:
@@ -38,3 +226,19 @@ def get_db():
 def get_session():
     with Session(engine) as session:
         yield session
+
+
+async def get_async_db():
+    async with AsyncSession(async_engine) as session:
+        yield session
+
+
+async def async_fetch_all(statement):
+    async with AsyncSession(async_engine) as session:
+        return (await session.exec(statement)).all()
+
+
+async def async_fetch_rows(statement):
+    # plain Core rows, no ORM entities
+    async with async_engine.connect() as connection:
+        return (await connection.execute(statement)).all()
@@ -0,0 +1,319 @@
+"""Bulk export of Race_Data as CSV, NDJSON, Arrow IPC or Parquet.
+
+    python -m app.export --format parquet [--columns race_id,driver_id,...]
+        [--year-from 2000] [--year-to 2010] [--out race-data.parquet]
+
+Only the selected columns are read, EXPORT_CHUNK_ROWS rows at a time from
+the cursor, and every chunk is encoded and written (or sent) before the
+next one is read, so memory does not grow with the export. The HTTP
+endpoint writes the same bytes to EXPORT_DIR/<db version>/ while it
+streams; once an export finished, later requests for it are served as a
+file, with Range support to resume downloads.
+
+Arrow and Parquet need pyarrow.
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import os
+import re
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from typing import NamedTuple
+
+from sqlmodel import Session, select
+
+from app import config, database
+from app.api import RACE_DATA_KEY, dumps
+from app.models.f1 import Race, Race_Data
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional, CSV and NDJSON always work
+    pa = pq = None
+
+COLUMNS = {
+    "year": Race.year,
+    **{column.name: column for column in Race_Data.__table__.columns},
+}
+
+# format -> (file extension, media type)
+FORMATS = {
+    "csv": ("csv", "text/csv; charset=utf-8"),
+    "ndjson": ("ndjson", "application/x-ndjson"),
+    "arrow": ("arrows", "application/vnd.apache.arrow.stream"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+
+def available_formats():
+    if pa is None:
+        return ("csv", "ndjson")
+    return tuple(FORMATS)
+
+
+class ExportSpec(NamedTuple):
+    format: str
+    columns: tuple
+    year_from: int | None = None
+    year_to: int | None = None
+
+    def key(self):
+        return hashlib.sha1(repr(self).encode()).hexdigest()[:16]
+
+    def filename(self):
+        years = f"{self.year_from or 'first'}-{self.year_to or 'last'}"
+        return f"race-data-{years}.{FORMATS[self.format][0]}"
+
+    @property
+    def media_type(self):
+        return FORMATS[self.format][1]
+
+
+def export_spec(format="csv", columns=None, year_from=None, year_to=None):
+    """Validated ExportSpec; ValueError names what is wrong."""
+    if format not in FORMATS:
+        raise ValueError(f"Unknown format {format!r}")
+    if format not in available_formats():
+        raise ValueError(f"{format} export needs pyarrow")
+    names = tuple(COLUMNS) if not columns else tuple(columns.split(","))
+    unknown = [name for name in names if name not in COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+    return ExportSpec(format, names, year_from, year_to)
+
+
+def export_query(spec: ExportSpec):
+    query = select(*(COLUMNS[name] for name in spec.columns)).select_from(Race_Data)
+    if "year" in spec.columns:
+        query = query.join(Race, Race.id == Race_Data.race_id)
+    if spec.year_from is not None or spec.year_to is not None:
+        races = select(Race.id)
+        if spec.year_from is not None:
+            races = races.where(Race.year >= spec.year_from)
+        if spec.year_to is not None:
+            races = races.where(Race.year <= spec.year_to)
+        query = query.where(Race_Data.race_id.in_(races))
+    return query.order_by(*RACE_DATA_KEY)
+
+
+class CSVEncoder:
+    def __init__(self, spec: ExportSpec):
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+        self.writer.writerow(spec.columns)
+
+    def _take(self):
+        data = self.buffer.getvalue().encode()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+    def encode(self, rows):
+        self.writer.writerows(rows)
+        return self._take()
+
+    def close(self):
+        return self._take()
+
+
+class NDJSONEncoder:
+    def __init__(self, spec: ExportSpec):
+        self.columns = spec.columns
+
+    def encode(self, rows):
+        columns = self.columns
+        return b"".join(dumps(dict(zip(columns, row))) + b"\n" for row in rows)
+
+    def close(self):
+        return b""
+
+
+class _Sink:
+    """Write-only file object handing over what pyarrow wrote so far."""
+
+    closed = False
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def arrow_type(column):
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        python_type = str
+    return {int: pa.int64(), float: pa.float64(), bool: pa.bool_()}.get(
+        python_type, pa.string()
+    )
+
+
+class ArrowEncoder:
+    def __init__(self, spec: ExportSpec):
+        self.schema = pa.schema(
+            [(name, arrow_type(COLUMNS[name])) for name in spec.columns]
+        )
+        self.sink = _Sink()
+        self.writer = self.open(pa.PythonFile(self.sink, mode="w"))
+
+    def open(self, file):
+        return pa.ipc.new_stream(file, self.schema)
+
+    def encode(self, rows):
+        arrays = [
+            pa.array(values, type=field.type)
+            for values, field in zip(zip(*rows), self.schema)
+        ]
+        self.writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+        return self.sink.take()
+
+    def close(self):
+        self.writer.close()
+        return self.sink.take()
+
+
+class ParquetEncoder(ArrowEncoder):
+    # one row group per chunk
+    def open(self, file):
+        return pq.ParquetWriter(file, self.schema)
+
+
+ENCODERS = {
+    "csv": CSVEncoder,
+    "ndjson": NDJSONEncoder,
+    "arrow": ArrowEncoder,
+    "parquet": ParquetEncoder,
+}
+
+
+def export_chunks(db: Session, spec: ExportSpec):
+    """The encoded export, one chunk of rows at a time."""
+    encoder = ENCODERS[spec.format](spec)
+    query = export_query(spec).execution_options(yield_per=config.EXPORT_CHUNK_ROWS)
+    result = db.connection().execute(query)
+    for rows in result.partitions():
+        data = encoder.encode(rows)
+        if data:
+            yield data
+    data = encoder.close()
+    if data:
+        yield data
+
+
+def export_path(spec: ExportSpec, out=None) -> Path:
+    out = Path(out or config.EXPORT_DIR)
+    return out / database.db_version() / f"{spec.key()}.{FORMATS[spec.format][0]}"
+
+
+def cached_export(spec: ExportSpec, out=None):
+    path = export_path(spec, out)
+    return path if path.is_file() else None
+
+
+# EXPORT_DIR/<db_version()>; nothing else in EXPORT_DIR is ever removed
+RELEASE_DIR = re.compile(r"[0-9a-f]{16}")
+
+
+def drop_old_releases(out=None):
+    """Remove the exports of earlier f1db releases.
+
+    A release directory that still has an export being written is left
+    for a later call.
+    """
+    out = Path(out or config.EXPORT_DIR)
+    if not out.is_dir():
+        return
+    current = database.db_version()
+    for directory in out.iterdir():
+        if (
+            directory.name == current
+            or not RELEASE_DIR.fullmatch(directory.name)
+            or not directory.is_dir()
+            or any(directory.glob("*.partial"))
+        ):
+            continue
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def stream_to_file(chunks, path: Path):
+    """Pass chunks through, keeping them as `path` once the last one is sent.
+
+    A broken off export (client gone, error) leaves nothing behind.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, partial = tempfile.mkstemp(dir=path.parent, suffix=".partial")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            for chunk in chunks:
+                file.write(chunk)
+                yield chunk
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.unlink(partial)
+
+
+def stream_export(spec: ExportSpec, out=None):
+    # own session: the generator outlives the request's get_db dependency
+    with database.open_db() as db:
+        yield from stream_to_file(export_chunks(db, spec), export_path(spec, out))
+
+
+def write_export(spec: ExportSpec, out=None) -> Path:
+    for _ in stream_export(spec, out):
+        pass
+    return export_path(spec, out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export Race_Data rows")
+    parser.add_argument("--format", default="csv", choices=FORMATS)
+    parser.add_argument("--columns", default=None, help="comma separated")
+    parser.add_argument("--year-from", type=int, default=None)
+    parser.add_argument("--year-to", type=int, default=None)
+    parser.add_argument("--out", default=None, help="file, - for stdout")
+    args = parser.parse_args()
+
+    try:
+        spec = export_spec(args.format, args.columns, args.year_from, args.year_to)
+    except ValueError as error:
+        parser.error(str(error))
+    out = args.out or spec.filename()
+    with database.open_db() as db:
+        if out == "-":
+            for chunk in export_chunks(db, spec):
+                sys.stdout.buffer.write(chunk)
+            return
+        with open(out, "wb") as file:
+            for chunk in export_chunks(db, spec):
+                file.write(chunk)
+    print(f"Exported {spec.filename()} to {out}")
+
+
+if __name__ == "__main__":
+    main()
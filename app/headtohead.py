@@ -0,0 +1,243 @@
+"""Head-to-head comparisons of drivers, precomputed per f1db file.
+
+Every pair of drivers entered in the same qualifying session or race is
+compared once, from the columnar Race_Data in app.analytics: who was
+classified ahead and the gap in qualifying_time_millis/race_time_millis
+when both have a time. The comparisons are summed per (pair, year,
+same constructor) into sorted arrays, so a driver comparison or a
+season's teammate battles are binary searches instead of a self-join of
+Race_Data per request. Teammates come from Season_Entrant_Driver.
+"""
+
+import numpy as np
+from sqlmodel import Session, select
+
+from app.analytics import (
+    MISSING,
+    QUALIFYING_RESULT,
+    RACE_RESULT,
+    RaceDataColumns,
+    race_data_cache,
+)
+from app.cache import DerivedCache
+from app.models.f1 import Season_Entrant_Driver
+
+# session -> (Race_Data type, time column)
+SESSIONS = {
+    "qualifying": (QUALIFYING_RESULT, "qualifying_time_millis"),
+    "race": (RACE_RESULT, "race_time_millis"),
+}
+
+# key: lower driver code, higher driver code, year, same constructor
+DRIVER_BITS = 20
+YEAR_BITS = 15
+MAX_YEAR = (1 << YEAR_BITS) - 1
+
+
+def pair_key(low, high, year, same_team):
+    return (
+        (low.astype(np.int64) << (DRIVER_BITS + YEAR_BITS + 1))
+        | (high.astype(np.int64) << (YEAR_BITS + 1))
+        | (year.astype(np.int64) << 1)
+        | same_team.astype(np.int64)
+    )
+
+
+def same_race_pairs(race_id):
+    """Row index pairs (i, j), i < j, of rows sorted by race with equal race."""
+    firsts, seconds = [], []
+    offset = 1
+    while offset < len(race_id):
+        # sorted by race: once no row shares a race `offset` rows later,
+        # no row does further on either
+        (i,) = np.nonzero(race_id[:-offset] == race_id[offset:])
+        if not len(i):
+            break
+        firsts.append(i)
+        seconds.append(i + offset)
+        offset += 1
+    empty = [np.empty(0, dtype=np.intp)]
+    return np.concatenate(firsts or empty), np.concatenate(seconds or empty)
+
+
+class SessionIndex:
+    """Comparisons of one session type, summed per pair key."""
+
+    def __init__(self, columns: RaceDataColumns, type_name: str, millis_name: str):
+        (rows,) = np.nonzero(columns.type_mask(type_name))
+        rows = rows[np.argsort(columns.race_id[rows], kind="stable")]
+        i, j = same_race_pairs(columns.race_id[rows])
+        i, j = rows[i], rows[j]
+
+        driver = columns.driver
+        swap = driver[i] > driver[j]
+        low, high = np.where(swap, j, i), np.where(swap, i, j)
+        position = columns.position.astype(np.int64)
+        position[position == MISSING] = np.iinfo(np.int64).max
+        millis = columns.millis[millis_name]
+
+        keys = pair_key(
+            driver[low],
+            driver[high],
+            columns.year[low],
+            columns.constructor[low] == columns.constructor[high],
+        )
+        self.keys, inverse = np.unique(keys, return_inverse=True)
+
+        def total(weights=None):
+            return np.bincount(inverse, weights=weights, minlength=len(self.keys))
+
+        timed = (millis[low] != MISSING) & (millis[high] != MISSING)
+        self.meetings = total().astype(np.int32)
+        self.low_ahead = total(position[low] < position[high]).astype(np.int32)
+        self.high_ahead = total(position[high] < position[low]).astype(np.int32)
+        self.timed = total(timed).astype(np.int32)
+        gaps = np.where(timed, millis[low].astype(np.int64) - millis[high], 0)
+        self.gap_sum = total(gaps)
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def nbytes(self):
+        arrays = (
+            self.keys,
+            self.meetings,
+            self.low_ahead,
+            self.high_ahead,
+            self.timed,
+            self.gap_sum,
+        )
+        return sum(array.nbytes for array in arrays)
+
+    def entries(self, low, high, year_from, year_to):
+        """Index range of a pair's keys between two years."""
+        bounds = pair_key(
+            np.array([low, low]),
+            np.array([high, high]),
+            np.array([year_from, year_to]),
+            np.array([0, 1]),
+        )
+        start = np.searchsorted(self.keys, bounds[0], side="left")
+        stop = np.searchsorted(self.keys, bounds[1], side="right")
+        return slice(start, stop)
+
+    def summary(self, entries, swapped):
+        meetings = int(self.meetings[entries].sum())
+        ahead = [
+            int(self.low_ahead[entries].sum()),
+            int(self.high_ahead[entries].sum()),
+        ]
+        timed = int(self.timed[entries].sum())
+        gap = None
+        if timed:
+            gap = float(self.gap_sum[entries].sum()) / timed
+        if swapped:
+            ahead.reverse()
+            gap = None if gap is None else -gap
+        return {
+            "meetings": meetings,
+            "ahead": ahead,
+            "timed": timed,
+            # first driver's time minus the second's, per timed meeting
+            "mean_gap_millis": None if gap is None else round(gap, 1),
+        }
+
+
+class HeadToHeadIndex:
+    def __init__(self, columns: RaceDataColumns, teammates):
+        self.drivers = columns.dictionaries["driver"]
+        self.sessions = {
+            name: SessionIndex(columns, type_name, millis_name)
+            for name, (type_name, millis_name) in SESSIONS.items()
+        }
+        self.teammates = teammates  # year -> [(constructor, entrant, a, b)]
+
+    def __len__(self):
+        return sum(len(session) for session in self.sessions.values())
+
+    @property
+    def nbytes(self):
+        return sum(session.nbytes for session in self.sessions.values())
+
+    def compare(
+        self, driver_a, driver_b, year_from=None, year_to=None, teammates_only=False
+    ):
+        """Qualifying and race comparison of two drivers, or None if unknown."""
+        a = self.drivers.codes.get(driver_a)
+        b = self.drivers.codes.get(driver_b)
+        if a is None or b is None or a == b:
+            return None
+        swapped = a > b
+        low, high = (b, a) if swapped else (a, b)
+        # a year outside YEAR_BITS would spill into the driver bits of the key
+        year_from = 0 if year_from is None else min(max(year_from, 0), MAX_YEAR)
+        year_to = MAX_YEAR if year_to is None else min(max(year_to, 0), MAX_YEAR)
+        result = {"drivers": [driver_a, driver_b]}
+        for name, session in self.sessions.items():
+            entries = session.entries(low, high, year_from, year_to)
+            if teammates_only:
+                # same constructor is the lowest key bit
+                (same,) = np.nonzero(session.keys[entries] & 1)
+                entries = same + entries.start
+            result[name] = session.summary(entries, swapped)
+        return result
+
+    def season_teammates(self, year):
+        battles = []
+        for constructor, entrant, driver_a, driver_b in self.teammates.get(year, ()):
+            battle = self.compare(driver_a, driver_b, year, year, teammates_only=True)
+            if battle is None or not any(
+                battle[name]["meetings"] for name in self.sessions
+            ):
+                continue
+            battles.append({"constructor": constructor, "entrant": entrant, **battle})
+        return battles
+
+
+def teammates_query():
+    return (
+        select(
+            Season_Entrant_Driver.year,
+            Season_Entrant_Driver.entrant_id,
+            Season_Entrant_Driver.constructor_id,
+            Season_Entrant_Driver.driver_id,
+        )
+        .where(Season_Entrant_Driver.test_driver.is_(False))
+        .order_by(
+            Season_Entrant_Driver.year,
+            Season_Entrant_Driver.entrant_id,
+            Season_Entrant_Driver.constructor_id,
+        )
+    )
+
+
+def teammate_pairs(rows):
+    """year -> [(constructor, entrant, driver, driver)] from entrant rows."""
+    teams = {}
+    for year, entrant, constructor, driver in rows:
+        drivers = teams.setdefault((year, entrant, constructor), [])
+        # one row per engine, so a driver can be listed twice
+        if driver not in drivers:
+            drivers.append(driver)
+    pairs = {}
+    for (year, entrant, constructor), drivers in teams.items():
+        for n, driver_a in enumerate(drivers):
+            for driver_b in drivers[n + 1 :]:
+                pairs.setdefault(year, []).append(
+                    (constructor, entrant, driver_a, driver_b)
+                )
+    return pairs
+
+
+def build_head_to_head(db: Session) -> HeadToHeadIndex:
+    columns = race_data_cache.get(db)
+    teammates = teammate_pairs(db.connection().execute(teammates_query()))
+    return HeadToHeadIndex(columns, teammates)
+
+
+head_to_head_cache = DerivedCache(
+    build_head_to_head,
+    lambda index: f"Built head-to-head index of {len(index)} pair seasons "
+    f"({index.nbytes / 1024 / 1024:.1f} MiB)",
+)
@@ -0,0 +1,181 @@
+"""Explain the app's queries and build an indexed sidecar of the f1db file.
+
+    python -m app.indexadvisor            # report full scans
+    python -m app.indexadvisor --build    # also write the sidecar + timings
+
+The shipped f1db file is never modified: the indexes go into a copy
+(F1STATS_DB_INDEXED_PATH), which the app uses with F1STATS_USE_INDEXED_DB=1.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import time
+
+from sqlalchemy.dialects import sqlite
+
+from app import config
+from app.database import file_version, sqlite_uri
+from app.progression import STANDINGS, standings_query
+from app.queries import SeasonData, season_queries, seasons_query
+from app.stats import driver_nationality_query, engine_manufacturer_wins_query
+
+SIDECAR_TABLE = "f1stats_sidecar"
+
+# covering indexes for the filters, joins and orderings of the query set
+INDEXES = {
+    "ix_race_year_date": "race (year, date, round, official_name)",
+    "ix_season_constructor_year_position": (
+        "season_constructor (year, position_number, constructor_id)"
+    ),
+    "ix_season_constructor_standing_year_position": (
+        "season_constructor_standing (year, position_number)"
+    ),
+    "ix_season_driver_standing_year_position": (
+        "season_driver_standing (year, position_number, driver_id, points)"
+    ),
+    "ix_season_entrant_driver_year_driver": (
+        "season_entrant_driver (year, driver_id, constructor_id, engine_manufacturer_id)"
+    ),
+    "ix_race_data_position_type": (
+        "race_data (position_number, type, engine_manufacturer_id, race_id)"
+    ),
+    "ix_driver_nationality": "driver (nationality_country_id)",
+}
+
+
+def query_set(year):
+    queries = list(zip(SeasonData._fields, season_queries(year)))
+    queries += [
+        ("seasons", seasons_query()),
+        ("driver_nationality", driver_nationality_query()),
+        ("engine_manufacturer_wins", engine_manufacturer_wins_query()),
+        *((f"{kind}_progression", standings_query(kind, year)) for kind in STANDINGS),
+    ]
+    return [
+        (
+            name,
+            str(
+                query.compile(
+                    dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}
+                )
+            ),
+        )
+        for name, query in queries
+    ]
+
+
+def explain(connection, sql):
+    return [row[3] for row in connection.execute(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+def full_scans(plan):
+    # "SCAN t USING COVERING INDEX ..." still reads every row of t
+    return [step for step in plan if step.startswith("SCAN ")]
+
+
+def time_query(connection, sql, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        connection.execute(sql).fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def analyze(path, queries, repeat):
+    connection = sqlite3.connect(sqlite_uri(path), uri=True)
+    try:
+        report = {}
+        for name, sql in queries:
+            plan = explain(connection, sql)
+            report[name] = {
+                "plan": plan,
+                "full_scans": full_scans(plan),
+                "median_ms": time_query(connection, sql, repeat),
+            }
+        return report
+    finally:
+        connection.close()
+
+
+def build_sidecar(source, destination):
+    tmp = f"{destination}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    source_connection = sqlite3.connect(sqlite_uri(source), uri=True)
+    sidecar = sqlite3.connect(tmp)
+    try:
+        source_connection.backup(sidecar)
+        for name, columns in INDEXES.items():
+            sidecar.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {columns}")
+        sidecar.execute("ANALYZE")
+        sidecar.execute(
+            f"CREATE TABLE {SIDECAR_TABLE} (key TEXT PRIMARY KEY, value TEXT)"
+        )
+        sidecar.execute(
+            f"INSERT INTO {SIDECAR_TABLE} VALUES ('source_version', ?)",
+            (file_version(source),),
+        )
+        sidecar.commit()
+    finally:
+        sidecar.close()
+        source_connection.close()
+    os.replace(tmp, destination)
+
+
+def print_report(title, report):
+    print(title)
+    for name, result in report.items():
+        scans = ", ".join(result["full_scans"]) or "-"
+        print(f"  {name:<28} {result['median_ms']:8.3f} ms  full scans: {scans}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index advisor for the f1db file")
+    parser.add_argument("--db", default=config.DB_PATH)
+    parser.add_argument("--out", default=config.DB_INDEXED_PATH)
+    parser.add_argument("--year", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--build", action="store_true", help="write the sidecar")
+    parser.add_argument("--report", default="datastore/index-report.json")
+    args = parser.parse_args()
+
+    year = args.year
+    if year is None:
+        connection = sqlite3.connect(sqlite_uri(args.db), uri=True)
+        year = connection.execute("SELECT max(year) FROM season").fetchone()[0]
+        connection.close()
+    queries = query_set(year)
+
+    before = analyze(args.db, queries, args.repeat)
+    print_report(f"{args.db} (year {year})", before)
+    if not args.build:
+        return
+
+    started = time.perf_counter()
+    build_sidecar(args.db, args.out)
+    print(f"Built {args.out} in {time.perf_counter() - started:.1f}s")
+    after = analyze(args.out, queries, args.repeat)
+    print_report(args.out, after)
+
+    with open(args.report, "w") as report:
+        json.dump(
+            {
+                "year": year,
+                "source": args.db,
+                "sidecar": args.out,
+                "indexes": INDEXES,
+                "before": before,
+                "after": after,
+            },
+            report,
+            indent=2,
+        )
+    print(f"Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
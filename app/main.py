@@ -1,31 +1,80 @@
+import asyncio
 from typing import Optional
-from fastapi import Depends, FastAPI
-from fastapi.responses import HTMLResponse
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import (
+    FileResponse,
+    HTMLResponse,
+    JSONResponse,
+    PlainTextResponse,
+    StreamingResponse,
+)
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
+from types import SimpleNamespace
 import htmlgenerator as hg
-from htmlgenerator import mark_safe
-from sqlalchemy.sql.functions import count
-from sqlmodel import Session, select
-import pygal
-
-from app.database import close_db, create_db_and_tables, get_db
-from app.models.f1 import (
-    Constructor,
-    Country,
-    Driver,
-    Engine,
-    Engine_Manufacturer,
-    Race,
-    Race_Data,
-    Season,
-    Season_Constructor,
-    Season_Constructor_Standing,
-    Season_Driver_Standing,
-    Season_Entrant_Driver,
-    Season_Entrant_Engine,
+from sqlmodel import Session
+
+from app import api, config, profiling, timing
+from app.analytics import (
+    ENTITIES,
+    MAX_LIMIT,
+    STATISTICS,
+    aggregate,
+    race_data_cache,
+)
+from app.cache import (
+    CompiledPage,
+    DerivedCache,
+    fragment_cache,
+    fragment_headers,
+    fragment_response,
+)
+from app.charts import chart_cache, chart_renderer
+from app.database import (
+    close_async_db,
+    close_db,
+    create_db_and_tables,
+    db_version,
+    get_db,
+    load_into_memory,
+    open_db,
+)
+from app.export import (
+    cached_export,
+    drop_old_releases,
+    export_spec,
+    stream_export,
+    write_export,
+)
+from app.headtohead import head_to_head_cache
+from app.search import results_html, search_index_cache
+from app.prerender import prerendered_response
+from app.progression import progression_cache
+from app.queries import (
+    LazySeasonData,
+    fetch_seasons,
+    fetch_seasons_async,
+    start_season_queries,
+)
+from app.season import (
+    CHARTS,
+    SEASON_CHARTS,
+    SEASON_TABLES,
+    TABLES,
+    SeasonPage,
+    chart_fragment,
+    progression_fragment,
+    season_page,
+    table_fragment,
+)
+from app.stats import stats_cache
+from app.summary import (
+    build_summary,
+    load_season,
+    load_season_async,
+    summary_store,
 )
-
 
 HTML_404_PAGE = "<h1>404</h1>"
 
@@ -42,423 +91,367 @@ exceptions = {
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("Starting up")
+    if config.DB_IN_MEMORY:
+        load_into_memory()
     create_db_and_tables()
+    with open_db() as db:
+        stats_cache.get(db)
+        compiled_root(db)
+        search_index_cache.get(db)
+        if config.USE_SUMMARY_DB:
+            build_summary(db)
+    chart_renderer.start(config.CHART_WORKERS)
     yield
     print("Shutting down")
+    chart_renderer.shutdown()
     close_db()
+    await close_async_db()
 
 
 app = FastAPI(
     docs_url=None, redoc_url=None, exception_handlers=exceptions, lifespan=lifespan
 )
 
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.add_middleware(timing.TimingMiddleware)
 
+app.include_router(api.router)
 
-@app.get("/api/season", response_class=HTMLResponse)
-def read_season(year: Optional[int | None] = None, db: Session = Depends(get_db)):
+app.mount("/static", StaticFiles(directory="static"), name="static")
 
-    if year == 0:
-        return ""
 
-    number_of_races = db.exec(
-        select(Race).where(Race.year == year).order_by(Race.date)
-    ).all()
-
-    constructors = db.exec(
-        select(Season_Constructor, Constructor.full_name)
-        .join(Constructor, Season_Constructor.constructor_id == Constructor.id)
-        .where(Season_Constructor.year == year)
-        .order_by(Season_Constructor.position_number)
-    ).all()
-
-    constructors_standing = db.exec(
-        select(Season_Constructor_Standing)
-        .where(Season_Constructor_Standing.year == year)
-        .order_by(Season_Constructor_Standing.position_number)
-    ).all()
-
-    season_driver_standing = db.exec(
-        select(Season_Driver_Standing, Season_Entrant_Driver)
-        .join(
-            Season_Entrant_Driver,
-            Season_Driver_Standing.driver_id == Season_Entrant_Driver.driver_id,
-        )
-        .where(Season_Driver_Standing.year == year)
-        .where(Season_Entrant_Driver.year == year)
-        .order_by(Season_Driver_Standing.position_number)
-    ).all()
-
-    # Constructors
-    constructors_bar_chart = pygal.Bar(
-        x_label_rotation=40, width=900, height=600, explicit_size=True
-    )
-    constructors_bar_chart.title = "Constructors"
-    constructors_bar_chart.x_title = "Position"
-    constructors_bar_chart.x_labels = [
-        str(constructor.Season_Constructor.constructor_id)
-        for constructor in constructors
-    ]
-    constructors_bar_chart.y_title = "Points"
-    constructors_bar_chart.add(
-        "Points", [constructor.points for constructor in constructors_standing]
+@app.get("/metrics", response_class=PlainTextResponse)
+def read_metrics():
+    return PlainTextResponse(
+        timing.metrics_text(), media_type="text/plain; version=0.0.4"
     )
 
-    # Constructors podiums
-    constructors_podiums_bar_chart = pygal.Bar(
-        x_label_rotation=40, width=900, height=600, explicit_size=True
-    )
-    constructors_podiums_bar_chart.title = "Constructors"
-    constructors_podiums_bar_chart.x_title = "Position"
-    constructors_podiums_bar_chart.x_labels = [
-        str(constructor.Season_Constructor.constructor_id)
-        for constructor in constructors
-    ]
-
-    # other stats
-    # driver_nationality
-    driver_nationality = db.exec(
-        select(Country.name, count(Driver.nationality_country_id))
-        .join(
-            Country,
-            Driver.nationality_country_id == Country.id,
-        )
-        .group_by(Country.name)
-        .order_by(count(Driver.nationality_country_id).desc())
-    ).all()
-
-    print()
-
-    # engine manufacturer wins
-    engine_manufacturer_wins = db.exec(
-        select(
-            count(Race_Data.race_id).label("wins"),
-            Season_Entrant_Engine.engine_manufacturer_id.label("manufacturer"),
-            # Engine.full_name.label("engine_name"),
-            Engine_Manufacturer.name.label("engine_manufacturer"),
-            Engine_Manufacturer.country_id,
-        )
-        .join(
-            Constructor,
-            Race_Data.constructor_id == Constructor.id,
-        )
-        .join(
-            Season_Entrant_Engine,
-            Season_Entrant_Engine.constructor_id == Constructor.id,
-        )
-        .join(
-            Engine,
-            Season_Entrant_Engine.engine_id == Engine.id,
-        )
-        .join(
-            Engine_Manufacturer,
-            Season_Entrant_Engine.engine_manufacturer_id == Engine_Manufacturer.id,
+
+@app.get("/api/cache-stats")
+def read_cache_stats():
+    return {
+        "stats": stats_cache.counters(),
+        "fragments": fragment_cache.counters(),
+        "charts": chart_cache.counters(),
+        "progression": progression_cache.counters(),
+        "compression": timing.compression_ratios(),
+    }
+
+
+@app.get("/api/admin/profile")
+async def read_profile(
+    request: Request,
+    seconds: float = 10,
+    interval_ms: float = 5,
+    format: str = "collapsed",
+):
+    profiling.require_admin(request)
+    if format not in ("collapsed", "speedscope"):
+        raise HTTPException(status_code=400)
+    if not profiling.sampling_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409)
+    try:
+        sampler = profiling.Sampler(max(interval_ms, 1) / 1000)
+        sampler.start()
+        try:
+            await asyncio.sleep(min(max(seconds, 0), profiling.MAX_SECONDS))
+        finally:
+            await run_in_threadpool(sampler.stop)
+    finally:
+        profiling.sampling_lock.release()
+    if format == "speedscope":
+        return JSONResponse(
+            profiling.speedscope(sampler.samples, sampler.interval, sampler.duration)
         )
-        .where(Race_Data.position_number == 1)
-        .group_by(Season_Entrant_Engine.engine_manufacturer_id)
-        .order_by(count(Race_Data.race_id).desc())
-    ).all()
-
-    # bar_chart2.y_title = "Total Podiums"
-    constructors_podiums_bar_chart.add(
-        "Total Podiums",
-        [constructor.Season_Constructor.total_podiums for constructor in constructors],
+    return PlainTextResponse(profiling.collapsed(sampler.samples))
+
+
+@app.get("/api/stats/{statistic}")
+def read_statistic(
+    statistic: str,
+    by: str = "driver",
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    limit: int = 20,
+    db: Session = Depends(get_db),
+):
+    if statistic not in STATISTICS or by not in ENTITIES:
+        raise HTTPException(status_code=404)
+    limit = max(1, min(limit, MAX_LIMIT))
+    columns = race_data_cache.get(db)
+    rows = aggregate(columns, statistic, by, year_from, year_to, limit)
+    return [{"id": id, "value": value} for id, value in rows]
+
+
+@app.get("/api/head-to-head/{driver_a}/{driver_b}")
+def read_head_to_head(
+    driver_a: str,
+    driver_b: str,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    teammates: bool = False,
+    db: Session = Depends(get_db),
+):
+    comparison = head_to_head_cache.get(db).compare(
+        driver_a, driver_b, year_from, year_to, teammates
     )
-    # bar_chart2.y_title = "Total Race Wins"
-    constructors_podiums_bar_chart.add(
-        "Total Race Wins",
-        [
-            constructor.Season_Constructor.total_race_wins
-            for constructor in constructors
-        ],
+    if comparison is None:
+        raise HTTPException(status_code=404)
+    return comparison
+
+
+@app.get("/api/search", response_class=HTMLResponse)
+async def read_search(q: str = "", format: str = "html"):
+    if format not in ("html", "json"):
+        raise HTTPException(status_code=400)
+    # plain CPU work well under a millisecond: no threadpool hop per keystroke
+    index = search_index_cache.current()
+    if index is None:
+        index = await run_in_threadpool(load_search_index)
+    results = index.search(q)
+    if format == "json":
+        return JSONResponse(
+            [{"kind": kind, "id": id, "name": name} for kind, id, name in results]
+        )
+    return HTMLResponse(results_html(results))
+
+
+def load_search_index():
+    with open_db() as db:
+        return search_index_cache.get(db)
+
+
+@app.get("/api/export/race-data")
+async def read_export(
+    request: Request,
+    format: str = "csv",
+    columns: Optional[str] = None,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+):
+    try:
+        spec = export_spec(format, columns, year_from, year_to)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    path = cached_export(spec)
+    if path is None:
+        # a new export: the f1db release may be new too
+        await run_in_threadpool(drop_old_releases)
+    if path is None and "range" in request.headers:
+        # a resumed download needs the whole file to take the range from
+        path = await run_in_threadpool(write_export, spec)
+    if path is not None:
+        return FileResponse(path, media_type=spec.media_type, filename=spec.filename())
+    return StreamingResponse(
+        stream_export(spec),
+        media_type=spec.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{spec.filename()}"'},
     )
 
-    # Drivers
-    drivers_bar_chart = pygal.Bar(
-        x_label_rotation=40, width=900, height=600, explicit_size=True
-    )
-    drivers_bar_chart.title = "Drivers"
-    drivers_bar_chart.x_title = "Position"
-    drivers_bar_chart.x_labels = [
-        str(driver.Season_Driver_Standing.driver_id)
-        for driver in season_driver_standing
-    ]
-    drivers_bar_chart.y_title = "Points"
-    drivers_bar_chart.add(
-        "Points",
-        [driver.Season_Driver_Standing.points for driver in season_driver_standing],
-    )
 
-    # Drivers nationality
-    drivers_nationality_bar_chart = pygal.Bar(
-        x_label_rotation=40, width=1300, height=800, explicit_size=True
-    )
-    drivers_nationality_bar_chart.title = "Drivers"
-    drivers_nationality_bar_chart.x_title = "Country"
-    drivers_nationality_bar_chart.x_labels = [
-        driver[0] for driver in driver_nationality
-    ]
-    drivers_nationality_bar_chart.y_title = "Number of drivers"
-    drivers_nationality_bar_chart.add(
-        "Number of drivers", [driver[1] for driver in driver_nationality]
-    )
+@app.get("/api/season/{year}/teammates")
+def read_season_teammates(year: int, db: Session = Depends(get_db)):
+    return head_to_head_cache.get(db).season_teammates(year)
 
-    engine_manufacturer_wins_bar_chart = pygal.Bar(
-        x_label_rotation=40, width=1300, height=800, explicit_size=True
-    )
-    engine_manufacturer_wins_bar_chart.title = "Engine Manufacturers"
-    engine_manufacturer_wins_bar_chart.x_title = "Manufacturer"
-    engine_manufacturer_wins_bar_chart.x_labels = [
-        engine_manufacturer[1] for engine_manufacturer in engine_manufacturer_wins
-    ]
-    engine_manufacturer_wins_bar_chart.y_title = "Number of wins"
-    engine_manufacturer_wins_bar_chart.add(
-        "Number of wins",
-        [engine_manufacturer[0] for engine_manufacturer in engine_manufacturer_wins],
-    )
 
-    constructors_svg_chart = constructors_bar_chart.render().decode("utf-8")
-    constructors_podiums_svg_chart = constructors_podiums_bar_chart.render().decode(
-        "utf-8"
-    )
-    drivers_svg_chart = drivers_bar_chart.render().decode("utf-8")
-    drivers_nationality_svg_chart = drivers_nationality_bar_chart.render().decode(
-        "utf-8"
-    )
-    engine_manufacturer_wins_svg_chart = (
-        engine_manufacturer_wins_bar_chart.render().decode("utf-8")
-    )
+def read_season(
+    request: Request, year: Optional[int | None] = None, db: Session = Depends(get_db)
+):
 
-    # races
-
-    my_page = hg.DIV(
-        hg.H1(f"Formula 1 Standings {str(year)}"),
-        hg.H2(f"Number of races: {str(len(number_of_races))}"),
-        hg.TABLE(
-            hg.THEAD(
-                hg.TR(
-                    hg.TH("Date"),
-                    hg.TH("Grand Prix"),
-                    hg.TH("Round"),
-                )
-            ),
-            hg.TBODY(
-                *[
-                    hg.TR(
-                        hg.TD(str(race.date)),
-                        hg.TD(race.official_name),
-                        hg.TD(str(race.round)),
-                    )
-                    for race in number_of_races
-                ]
-            ),
-            _class="pure-table pure-table-bordered",
-        ),
-        hg.HR(),
-        hg.DIV(
-            hg.H2(f"Constructors {str(year)}"),
-        ),
-        hg.TABLE(
-            hg.THEAD(
-                hg.TR(
-                    hg.TH("Pos"),
-                    hg.TH("Constructor"),
-                    hg.TH("Best Starting Grid Position"),
-                    hg.TH("Best Race Result"),
-                    hg.TH("Total Race Entries"),
-                    hg.TH("Total Race Starts"),
-                    hg.TH("Total Race Wins"),
-                    hg.TH("Total 1 and 2 Finishes"),
-                    hg.TH("Total Race Laps"),
-                    hg.TH("Total Podiums"),
-                    hg.TH("Total Podium Races"),
-                    hg.TH("Total Points"),
-                    hg.TH("Total Pole Positions"),
-                    hg.TH("Total Fastest Laps"),
-                )
-            ),
-            hg.TBODY(
-                *[
-                    hg.TR(
-                        hg.TD(str(constructor.Season_Constructor.position_number)),
-                        hg.TD(constructor.full_name),
-                        hg.TD(
-                            str(
-                                constructor.Season_Constructor.best_starting_grid_position
-                            )
-                        ),
-                        hg.TD(str(constructor.Season_Constructor.best_race_result)),
-                        hg.TD(str(constructor.Season_Constructor.total_race_entries)),
-                        hg.TD(str(constructor.Season_Constructor.total_race_starts)),
-                        hg.TD(str(constructor.Season_Constructor.total_race_wins)),
-                        hg.TD(
-                            str(constructor.Season_Constructor.total_1_and_2_finishes)
-                        ),
-                        hg.TD(str(constructor.Season_Constructor.total_race_laps)),
-                        hg.TD(str(constructor.Season_Constructor.total_podiums)),
-                        hg.TD(str(constructor.Season_Constructor.total_podium_races)),
-                        hg.TD(str(constructor.Season_Constructor.total_points)),
-                        hg.TD(str(constructor.Season_Constructor.total_pole_positions)),
-                        hg.TD(str(constructor.Season_Constructor.total_fastest_laps)),
-                    )
-                    for constructor in constructors
-                ],
-            ),
-            _class="pure-table pure-table-bordered",
-        ),
-        hg.DIV(
-            mark_safe(constructors_svg_chart), mark_safe(constructors_podiums_svg_chart)
-        ),
-        hg.HR(),
-        hg.DIV(hg.H2(f"Constructors Standing {str(year)}")),
-        hg.TABLE(
-            hg.THEAD(
-                hg.TR(
-                    hg.TH("Pos"),
-                    hg.TH("Constructor"),
-                    hg.TH("Engine Manufacturer"),
-                    hg.TH("Points"),
-                )
-            ),
-            hg.TBODY(
-                *[
-                    hg.TR(
-                        hg.TD(str(constructor_standing.position_number)),
-                        hg.TD(constructor_standing.constructor_id),
-                        hg.TD(str(constructor_standing.engine_manufacturer_id)),
-                        hg.TD(str(constructor_standing.points)),
-                    )
-                    for constructor_standing in constructors_standing
-                ],
-            ),
-            _class="pure-table pure-table-bordered",
-        ),
-        hg.HR(),
-        hg.DIV(hg.H2(f"Drivers Standing {str(year)}")),
-        hg.TABLE(
-            hg.TR(
-                hg.TD(
-                    hg.TABLE(
-                        hg.THEAD(
-                            hg.TR(
-                                hg.TH("Pos"),
-                                hg.TH("Driver"),
-                                hg.TH("Points"),
-                                hg.TH("Team"),
-                                hg.TH("Engine Manufacturer"),
-                            )
-                        ),
-                        hg.TBODY(
-                            *[
-                                hg.TR(
-                                    hg.TD(
-                                        str(
-                                            driver_standing.Season_Driver_Standing.position_number
-                                        )
-                                    ),
-                                    hg.TD(
-                                        driver_standing.Season_Driver_Standing.driver_id
-                                    ),
-                                    hg.TD(
-                                        str(
-                                            driver_standing.Season_Driver_Standing.points
-                                        )
-                                    ),
-                                    hg.TD(
-                                        driver_standing.Season_Entrant_Driver.constructor_id
-                                    ),
-                                    hg.TD(
-                                        str(
-                                            driver_standing.Season_Entrant_Driver.engine_manufacturer_id
-                                        )
-                                    ),
-                                )
-                                for driver_standing in season_driver_standing
-                            ],
-                        ),
-                        _class="pure-table pure-table-bordered",
-                    ),
-                ),
-                hg.TD(
-                    hg.DIV(mark_safe(drivers_svg_chart)),
-                ),
+    if year == 0:
+        return ""
+    if profiling.profile_requested(request):
+        return profiling.profile_response(render_season, year, db)
+
+    prerendered = prerendered_response(request, f"season/{year}.html")
+    if prerendered is not None:
+        return prerendered
+
+    key = ("season", year)
+    version = db_version()
+    entry = fragment_cache.get(key, version)
+    if entry is None:
+        if config.STREAM_SEASON:
+            return StreamingResponse(
+                stream_season(key, version, year),
+                media_type="text/html",
+                headers=fragment_headers(),
             )
-        ),
-        hg.HR(),
-        hg.H2("Other Statistics (All years)"),
-        hg.HR(),
-        hg.DIV(hg.H2("Drivers Nationality")),
-        hg.TABLE(
-            hg.TR(
-                hg.TD(
-                    hg.TABLE(
-                        hg.THEAD(
-                            hg.TR(
-                                hg.TH("Country"),
-                                hg.TH("Number of drivers"),
-                            )
-                        ),
-                        hg.TBODY(
-                            *[
-                                hg.TR(
-                                    hg.TD(str(driver[0])),
-                                    hg.TD(str(driver[1])),
-                                )
-                                for driver in driver_nationality
-                            ],
-                        ),
-                        _class="pure-table pure-table-bordered",
-                    ),
-                ),
-                hg.TD(hg.DIV(mark_safe(drivers_nationality_svg_chart))),
-            ),
-        ),
-        hg.HR(),
-        hg.H2("Engine Manufacturers Wins"),
-        hg.TABLE(
-            hg.TR(
-                hg.TD(
-                    hg.TABLE(
-                        hg.TR(
-                            hg.TD(
-                                hg.TABLE(
-                                    hg.THEAD(
-                                        hg.TR(
-                                            hg.TH("Number of wins"),
-                                            hg.TH("Engine Manufacturer"),
-                                            hg.TH("Country"),
-                                        )
-                                    ),
-                                    hg.TBODY(
-                                        *[
-                                            hg.TR(
-                                                hg.TD(str(engine_wins[0])),
-                                                hg.TD(str(engine_wins[2])),
-                                                hg.TD(str(engine_wins[3])),
-                                            )
-                                            for engine_wins in engine_manufacturer_wins
-                                        ],
-                                    ),
-                                    _class="pure-table pure-table-bordered",
-                                ),
-                            ),
-                        ),
-                    ),
-                ),
-                hg.TD(hg.DIV(mark_safe(engine_manufacturer_wins_svg_chart))),
-            ),
-        ),
+        entry = fragment_cache.put(key, version, render_season(year, db).encode())
+    return fragment_response(request, entry)
+
+
+def stream_season(key, version, year):
+    # own session: the generator outlives the request's get_db dependency
+    chunks = []
+    with open_db() as db:
+        season_data = summary_store.read(year) or LazySeasonData(db, year)
+        page = SeasonPage(year, season_data, stats_cache.get(db), config.LAZY_FRAGMENTS)
+        for chunk in page.stream():
+            chunk = chunk.encode()
+            chunks.append(chunk)
+            yield chunk
+    fragment_cache.put(key, version, b"".join(chunks))
+
+
+def render_season(year: Optional[int], db: Session) -> str:
+    return season_page(
+        year, load_season(db, year), stats_cache.get(db), config.LAZY_FRAGMENTS
     )
-    return hg.render(my_page, {})
-
 
-@app.get("/", response_class=HTMLResponse)
-def read_root(db: Session = Depends(get_db)):
 
-    seasons = db.exec(select(Season)).all()
-
-    seasons.sort(key=lambda x: x.year, reverse=True)
+async def read_season_async(request: Request, year: Optional[int | None] = None):
 
+    if year == 0:
+        return ""
+    if profiling.profile_requested(request):
+        return await run_in_threadpool(profile_with_db, render_season, year)
+
+    prerendered = prerendered_response(request, f"season/{year}.html")
+    if prerendered is not None:
+        return prerendered
+
+    key = ("season", year)
+    version = db_version()
+    entry = fragment_cache.get(key, version)
+    if entry is None and config.STREAM_SEASON:
+        return StreamingResponse(
+            stream_season_async(key, version, year),
+            media_type="text/html",
+            headers=fragment_headers(),
+        )
+    if entry is None:
+        season_data = await load_season_async(year)
+        all_time_stats = stats_cache.current()
+        if all_time_stats is None:
+            all_time_stats = await run_in_threadpool(load_all_time_stats)
+        # rendering is CPU bound, keep it off the event loop
+        html = await run_in_threadpool(
+            season_page, year, season_data, all_time_stats, config.LAZY_FRAGMENTS
+        )
+        entry = fragment_cache.put(key, version, html.encode())
+    return fragment_response(request, entry)
+
+
+async def stream_season_async(key, version, year):
+    summary = await run_in_threadpool(summary_store.read, year)
+    tasks = start_season_queries(year) if summary is None else {}
+    try:
+        all_time_stats = stats_cache.current()
+        if all_time_stats is None:
+            all_time_stats = await run_in_threadpool(load_all_time_stats)
+        season_data = SimpleNamespace(**(summary._asdict() if summary else {}))
+        page = SeasonPage(year, season_data, all_time_stats, config.LAZY_FRAGMENTS)
+        chunks = [page.OPEN.encode()]
+        yield chunks[0]
+        for name, fields in page.SECTIONS:
+            # the queries run concurrently, a section only waits for its own
+            for field in fields:
+                if not hasattr(season_data, field):
+                    setattr(season_data, field, await tasks[field])
+            chunk = (await run_in_threadpool(page.render_section, name)).encode()
+            chunks.append(chunk)
+            yield chunk
+        chunks.append(page.CLOSE.encode())
+        yield chunks[-1]
+        fragment_cache.put(key, version, b"".join(chunks))
+    finally:
+        for task in tasks.values():
+            task.cancel()
+
+
+def profile_with_db(fn, *args):
+    # the async handlers profile the sync render path in a worker thread
+    with open_db() as db:
+        return profiling.profile_response(fn, *args, db)
+
+
+def load_all_time_stats():
+    with open_db() as db:
+        return stats_cache.get(db)
+
+
+@app.get("/api/season/{year}/chart/{name}", response_class=HTMLResponse)
+def read_season_chart(
+    request: Request, year: int, name: str, db: Session = Depends(get_db)
+):
+    if name not in CHARTS:
+        raise HTTPException(status_code=404)
+
+    # all-years charts are the same for every season, share one entry
+    key = ("chart", year if name in SEASON_CHARTS else None, name)
+    version = db_version()
+    entry = fragment_cache.get(key, version)
+    if entry is None:
+        season_data = load_season(db, year) if name in SEASON_CHARTS else None
+        spec = CHARTS[name](season_data, stats_cache.get(db))
+        entry = fragment_cache.put(key, version, chart_fragment(spec).encode())
+    return fragment_response(request, entry)
+
+
+@app.get("/api/season/{year}/table/{name}", response_class=HTMLResponse)
+def read_season_table(
+    request: Request, year: int, name: str, db: Session = Depends(get_db)
+):
+    if name not in TABLES:
+        raise HTTPException(status_code=404)
+
+    key = ("table", year if name in SEASON_TABLES else None, name)
+    version = db_version()
+    entry = fragment_cache.get(key, version)
+    if entry is None:
+        season_data = load_season(db, year) if name in SEASON_TABLES else None
+        html = table_fragment(name, season_data, stats_cache.get(db))
+        entry = fragment_cache.put(key, version, html.encode())
+    return fragment_response(request, entry)
+
+
+@app.get("/api/season/{year}/progression", response_class=HTMLResponse)
+def read_season_progression(request: Request, year: int, db: Session = Depends(get_db)):
+    key = ("progression", year)
+    version = db_version()
+    entry = fragment_cache.get(key, version)
+    if entry is None:
+        html = progression_fragment(year, progression_cache.get(db, year))
+        entry = fragment_cache.put(key, version, html.encode())
+    return fragment_response(request, entry)
+
+
+def read_root(request: Request, db: Session = Depends(get_db)):
+    if profiling.profile_requested(request):
+        return profiling.profile_response(render_root, db)
+    prerendered = prerendered_response(request, "index.html")
+    if prerendered is not None:
+        return prerendered
+    return fragment_response(request, compiled_root(db))
+
+
+async def read_root_async(request: Request):
+    if profiling.profile_requested(request):
+        return await run_in_threadpool(profile_with_db, render_root)
+    prerendered = prerendered_response(request, "index.html")
+    if prerendered is not None:
+        return prerendered
+    page = root_cache.current()
+    if page is None:
+        seasons = await fetch_seasons_async()
+        html = root_page(seasons)
+        page = root_cache.put(await run_in_threadpool(CompiledPage, html.encode()))
+    return fragment_response(request, page)
+
+
+# the root page only changes with the f1db file
+root_cache = DerivedCache(lambda db: CompiledPage(render_root(db).encode()))
+
+
+def compiled_root(db: Session) -> CompiledPage:
+    return root_cache.get(db)
+
+
+def render_root(db: Session) -> str:
+    return root_page(fetch_seasons(db))
+
+
+def root_page(seasons) -> str:
     seasons_selection = hg.SELECT(
         hg.OPTION(value="0", label=""),
         *[
@@ -488,6 +481,20 @@ def read_root(db: Session = Depends(get_db)):
         ),
         hg.BODY(
             hg.H1("F1 Stats"),
+            hg.DIV(
+                hg.INPUT(
+                    type="search",
+                    name="q",
+                    placeholder="Search drivers, constructors, circuits, grands prix",
+                    autocomplete="off",
+                    style="width: 400px",
+                    hx_get="/api/search",
+                    hx_trigger="input changed delay:100ms, search",
+                    hx_target="#search-results",
+                ),
+                hg.DIV(id="search-results"),
+                id="search",
+            ),
             hg.H3("Select season"),
             hg.DIV(
                 seasons_selection,
@@ -505,4 +512,13 @@ def read_root(db: Session = Depends(get_db)):
         doctype=True,
     )
 
-    return hg.render(my_page, {})
+    with timing.stage("html"):
+        return hg.render(my_page, {})
+
+
+if config.DB_MODE == "async":
+    app.add_api_route("/api/season", read_season_async, response_class=HTMLResponse)
+    app.add_api_route("/", read_root_async, response_class=HTMLResponse)
+else:
+    app.add_api_route("/api/season", read_season, response_class=HTMLResponse)
+    app.add_api_route("/", read_root, response_class=HTMLResponse)
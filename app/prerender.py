@@ -0,0 +1,134 @@
+"""Render every season page to disk.
+
+    python -m app.prerender [--out static/prerendered] [--workers N]
+
+The output lives under the static/ mount, and with F1STATS_PRERENDERED=1 the
+app serves these files (and their .gz/.br variants) instead of rendering.
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from fastapi import Request
+from fastapi.responses import FileResponse
+from sqlmodel import select
+
+from app import config, database, timing
+from app.cache import fragment_headers
+from app.compression import available_encodings, compress, negotiate
+from app.models.f1 import Season
+from app.progression import progression_cache
+from app.season import progression_fragment, season_page
+from app.stats import stats_cache
+from app.summary import load_season
+
+ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+MANIFEST_NAME = "manifest.json"
+
+
+def write_page(path: Path, html: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    body = html.encode("utf-8")
+    path.write_bytes(body)
+    for encoding in available_encodings():
+        suffixed = path.with_name(path.name + ENCODING_SUFFIXES[encoding])
+        suffixed.write_bytes(compress(body, encoding))
+    return len(body)
+
+
+def _init_worker():
+    # connections must not be shared with the parent after fork
+    database.engine.dispose(close=False)
+
+
+def _render_season(out_dir: str, year: int):
+    # eager, progression included: a static page must not call back into the app
+    with database.open_db() as db:
+        html = season_page(
+            year,
+            load_season(db, year),
+            stats_cache.get(db),
+            lazy=False,
+            progression=progression_fragment(year, progression_cache.get(db, year)),
+        )
+    return year, write_page(Path(out_dir) / "season" / f"{year}.html", html)
+
+
+def prerender(out_dir: str, workers: int | None = None):
+    from app.main import render_root
+
+    out = Path(out_dir)
+    started = time.perf_counter()
+    with database.open_db() as db:
+        years = [season.year for season in db.exec(select(Season)).all()]
+        write_page(out / "index.html", render_root(db))
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = [pool.submit(_render_season, str(out), year) for year in years]
+        total_bytes = sum(future.result()[1] for future in futures)
+
+    # written last: the app only trusts the output once the manifest matches
+    manifest = {"db_version": database.db_version(), "years": sorted(years)}
+    (out / MANIFEST_NAME).write_text(json.dumps(manifest))
+    print(
+        f"Rendered {len(years)} seasons ({total_bytes} bytes) into {out} "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+
+
+_manifest_cache = {}
+
+
+def _manifest_version(out: Path):
+    path = out / MANIFEST_NAME
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    cached = _manifest_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, json.loads(path.read_text()).get("db_version"))
+        _manifest_cache[path] = cached
+    return cached[1]
+
+
+def prerendered_response(request: Request, name: str):
+    """FileResponse for a prerendered page, or None to fall back to rendering."""
+    if not config.PRERENDERED:
+        return None
+    out = Path(config.PRERENDER_DIR)
+    # pages rendered from an older f1db release are ignored
+    if _manifest_version(out) != database.db_version():
+        return None
+    path = out / name
+    if not path.is_file():
+        return None
+    headers = fragment_headers()
+    headers["Vary"] = "Accept-Encoding"
+    offered = [
+        encoding
+        for encoding in available_encodings()
+        if path.with_name(path.name + ENCODING_SUFFIXES[encoding]).is_file()
+    ]
+    encoding = negotiate(request.headers.get("accept-encoding"), offered)
+    timing.record_identity_bytes(path.stat().st_size)
+    if encoding is not None:
+        path = path.with_name(path.name + ENCODING_SUFFIXES[encoding])
+        headers["Content-Encoding"] = encoding
+    return FileResponse(path, media_type="text/html", headers=headers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prerender every F1 season page")
+    parser.add_argument("--out", default=config.PRERENDER_DIR)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    prerender(args.out, args.workers)
+
+
+if __name__ == "__main__":
+    main()
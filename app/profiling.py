@@ -0,0 +1,141 @@
+"""Admin-only profiling of the running worker.
+
+A Sampler thread records the stack of every other thread in the process
+every few milliseconds and returns the samples as collapsed stacks
+(flamegraph.pl, speedscope, ...) or as a speedscope JSON profile. With
+`?profile=1` the page endpoints run one uncached render under cProfile and
+answer with the pstats summary instead of the page.
+
+Both need F1STATS_PROFILING=1 and the F1STATS_ADMIN_TOKEN bearer token.
+"""
+
+import cProfile
+import io
+import pstats
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+
+from fastapi import HTTPException, Request
+from fastapi.responses import PlainTextResponse
+
+from app import config
+
+MAX_SECONDS = 60
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+
+def require_admin(request: Request):
+    if not config.PROFILING:
+        raise HTTPException(status_code=404)
+    authorization = request.headers.get("authorization", "")
+    token = authorization.removeprefix("Bearer ").strip()
+    if not config.ADMIN_TOKEN or not secrets.compare_digest(
+        token.encode(), config.ADMIN_TOKEN.encode()
+    ):
+        raise HTTPException(status_code=403)
+
+
+def profile_requested(request: Request):
+    # with profiling off ?profile=1 is an ordinary query parameter
+    if not config.PROFILING or request.query_params.get("profile") != "1":
+        return False
+    require_admin(request)
+    return True
+
+
+def profile_response(fn, *args, limit=40):
+    profiler = cProfile.Profile()
+    profiler.runcall(fn, *args)
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.strip_dirs().sort_stats("cumulative").print_stats(limit)
+    return PlainTextResponse(out.getvalue())
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    # the function, not the current line, so samples of one call aggregate
+    return (code.co_qualname, code.co_filename, code.co_firstlineno)
+
+
+class Sampler(threading.Thread):
+    def __init__(self, interval: float):
+        super().__init__(name="f1stats-sampler", daemon=True)
+        self.interval = interval
+        self.samples = Counter()  # (thread name, *frames root first) -> count
+        self.started = None
+        self.duration = 0.0
+        self._done = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        self.started = time.perf_counter()
+        while not self._done.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                stack.reverse()
+                self.samples[(names.get(ident, str(ident)), *stack)] += 1
+        self.duration = time.perf_counter() - self.started
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+def collapsed(samples):
+    lines = []
+    for (thread, *stack), count in samples.most_common():
+        frames = [thread] + [
+            f"{name} ({filename.rsplit('/', 1)[-1]}:{line})"
+            for name, filename, line in stack
+        ]
+        lines.append(f"{';'.join(frames)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def speedscope(samples, interval, duration):
+    frames = []
+    index = {}
+
+    def frame_index(frame):
+        if frame not in index:
+            index[frame] = len(frames)
+            name, filename, line = frame
+            frames.append({"name": name, "file": filename, "line": line})
+        return index[frame]
+
+    stacks, weights = [], []
+    for (thread, *stack), count in samples.items():
+        root = frame_index((f"thread {thread}", "", 0))
+        stacks.append([root, *(frame_index(frame) for frame in stack)])
+        weights.append(count * interval)
+    return {
+        "$schema": SPEEDSCOPE_SCHEMA,
+        "exporter": "f1stats",
+        "name": "f1stats worker",
+        "shared": {"frames": frames},
+        "profiles": [
+            {
+                "type": "sampled",
+                "name": "all threads",
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": duration,
+                "samples": stacks,
+                "weights": weights,
+            }
+        ],
+    }
+
+
+# one sampling session at a time per worker
+sampling_lock = threading.Lock()
@@ -0,0 +1,148 @@
+"""Championship progression: the standings after every round of a season.
+
+Race_Driver_Standing and Race_Constructor_Standing are read with one query
+per table and season, then reshaped into dense round x entity arrays of
+points and positions. Seasons are cached per f1db file, so the progression
+view never goes back to the database round by round.
+"""
+
+import numpy as np
+from sqlmodel import Session, select
+
+from app.analytics import MISSING, Dictionary
+from app.cache import DerivedCache
+from app.models.f1 import Race, Race_Constructor_Standing, Race_Driver_Standing
+
+STANDINGS = {
+    "driver": (Race_Driver_Standing, Race_Driver_Standing.driver_id),
+    "constructor": (
+        Race_Constructor_Standing,
+        Race_Constructor_Standing.constructor_id,
+    ),
+}
+
+
+class Progression:
+    def __init__(self, rounds, races, entities, points, positions):
+        self.rounds = rounds  # int16 round numbers
+        self.races = races  # grand prix id per round
+        self.entities = entities  # ids in final standing order
+        self.points = points  # float32 [round, entity], carried forward
+        self.positions = positions  # int16 [round, entity], MISSING if unlisted
+
+    def __len__(self):
+        return len(self.entities)
+
+    @property
+    def nbytes(self):
+        return self.rounds.nbytes + self.points.nbytes + self.positions.nbytes
+
+
+def standings_query(kind: str, year: int):
+    model, entity = STANDINGS[kind]
+    # without the IN, SQLite scans the whole standings table and looks up the
+    # race of every row; with it, it reads the season's races by primary key
+    races = select(Race.id).where(Race.year == year)
+    return (
+        select(
+            Race.round,
+            Race.grand_prix_id,
+            entity,
+            model.points,
+            model.position_number,
+        )
+        .join(Race, Race.id == model.race_id)
+        .where(Race.year == year)
+        .where(model.race_id.in_(races))
+        .order_by(Race.round, model.position_display_order)
+    )
+
+
+def progression(rows) -> Progression:
+    """Reshape (round, grand prix, entity, points, position) rows."""
+    if not rows:
+        return Progression(
+            np.empty(0, np.int16),
+            [],
+            [],
+            np.empty((0, 0), np.float32),
+            np.empty((0, 0), np.int16),
+        )
+    round_numbers, races, ids, points, positions = zip(*rows)
+    rounds, first, round_index = np.unique(
+        np.array(round_numbers, dtype=np.int16), return_index=True, return_inverse=True
+    )
+    dictionary = Dictionary()
+    codes = dictionary.encode(ids)
+    shape = (len(rounds), len(dictionary))
+
+    dense_points = np.zeros(shape, dtype=np.float32)
+    dense_points[round_index, codes] = points
+    dense_positions = np.full(shape, MISSING, dtype=np.int16)
+    dense_positions[round_index, codes] = [
+        MISSING if position is None else position for position in positions
+    ]
+
+    # an entity missing from a round keeps the points of its last listed round
+    listed = np.zeros(shape, dtype=bool)
+    listed[round_index, codes] = True
+    last = np.where(listed, np.arange(shape[0])[:, None], 0)
+    np.maximum.accumulate(last, axis=0, out=last)
+    dense_points = np.take_along_axis(dense_points, last, axis=0)
+
+    # final classification first, then points for the unclassified
+    final = dense_positions[-1].astype(np.int32)
+    final[final == MISSING] = np.iinfo(np.int32).max
+    order = np.lexsort((-dense_points[-1], final))
+    return Progression(
+        rounds,
+        [races[i] for i in first],
+        [dictionary.values[code] for code in order],
+        dense_points[:, order],
+        dense_positions[:, order],
+    )
+
+
+def load_progression(db: Session, year: int) -> dict[str, Progression]:
+    connection = db.connection()
+    return {
+        kind: progression(connection.execute(standings_query(kind, year)).all())
+        for kind in STANDINGS
+    }
+
+
+class ProgressionCache:
+    """Progressions per season, dropped when the f1db file changes.
+
+    A season is a few KiB of arrays, so every season with standings is kept;
+    years without any (not in f1db, not started) are read again each time,
+    so arbitrary years from the URL do not grow the cache.
+    """
+
+    def __init__(self):
+        # year -> progressions, a new dict for every f1db file
+        self._seasons = DerivedCache(lambda db: {})
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, db: Session, year: int) -> dict[str, Progression]:
+        seasons = self._seasons.get(db)
+        season = seasons.get(year)
+        if season is not None:
+            self.hits += 1
+            return season
+        self.misses += 1
+        season = load_progression(db, year)
+        if any(season.values()):
+            seasons[year] = season
+        return season
+
+    def clear(self):
+        self._seasons.clear()
+
+    def counters(self):
+        seasons = self._seasons.current() or {}
+        return {"hits": self.hits, "misses": self.misses, "seasons": len(seasons)}
+
+
+progression_cache = ProgressionCache()
@@ -0,0 +1,227 @@
+import asyncio
+from functools import cached_property
+from typing import NamedTuple
+
+from sqlmodel import Session, select
+
+from app.database import async_fetch_rows
+from app.models.f1 import (
+    Constructor,
+    Race,
+    Season,
+    Season_Constructor,
+    Season_Constructor_Standing,
+    Season_Driver_Standing,
+    Season_Entrant_Driver,
+)
+
+
+class SeasonData(NamedTuple):
+    races: list
+    constructors: list
+    constructors_standing: list
+    season_driver_standing: list
+
+
+# Row classes: only the columns each view displays, as plain tuples, so rows
+# skip the ORM identity map and pydantic validation.
+
+
+class SeasonRow(NamedTuple):
+    year: int
+
+
+class RaceRow(NamedTuple):
+    date: object
+    official_name: str
+    round: int
+
+
+class ConstructorRow(NamedTuple):
+    constructor_id: str
+    full_name: str
+    position_number: int | None
+    best_starting_grid_position: int | None
+    best_race_result: int | None
+    total_race_entries: int
+    total_race_starts: int
+    total_race_wins: int
+    total_1_and_2_finishes: int
+    total_race_laps: int
+    total_podiums: int
+    total_podium_races: int
+    total_points: float
+    total_pole_positions: int
+    total_fastest_laps: int
+
+
+class ConstructorStandingRow(NamedTuple):
+    position_number: int | None
+    constructor_id: str
+    engine_manufacturer_id: str
+    points: float
+
+
+class DriverStandingRow(NamedTuple):
+    position_number: int | None
+    driver_id: str
+    points: float
+    constructor_id: str
+    engine_manufacturer_id: str
+
+
+def races_query(year):
+    return (
+        select(Race.date, Race.official_name, Race.round)
+        .where(Race.year == year)
+        .order_by(Race.date)
+    )
+
+
+def constructors_query(year):
+    return (
+        select(
+            Season_Constructor.constructor_id,
+            Constructor.full_name,
+            Season_Constructor.position_number,
+            Season_Constructor.best_starting_grid_position,
+            Season_Constructor.best_race_result,
+            Season_Constructor.total_race_entries,
+            Season_Constructor.total_race_starts,
+            Season_Constructor.total_race_wins,
+            Season_Constructor.total_1_and_2_finishes,
+            Season_Constructor.total_race_laps,
+            Season_Constructor.total_podiums,
+            Season_Constructor.total_podium_races,
+            Season_Constructor.total_points,
+            Season_Constructor.total_pole_positions,
+            Season_Constructor.total_fastest_laps,
+        )
+        .join(Constructor, Season_Constructor.constructor_id == Constructor.id)
+        .where(Season_Constructor.year == year)
+        .order_by(Season_Constructor.position_number)
+    )
+
+
+def constructors_standing_query(year):
+    return (
+        select(
+            Season_Constructor_Standing.position_number,
+            Season_Constructor_Standing.constructor_id,
+            Season_Constructor_Standing.engine_manufacturer_id,
+            Season_Constructor_Standing.points,
+        )
+        .where(Season_Constructor_Standing.year == year)
+        .order_by(Season_Constructor_Standing.position_number)
+    )
+
+
+def season_driver_standing_query(year):
+    return (
+        select(
+            Season_Driver_Standing.position_number,
+            Season_Driver_Standing.driver_id,
+            Season_Driver_Standing.points,
+            Season_Entrant_Driver.constructor_id,
+            Season_Entrant_Driver.engine_manufacturer_id,
+        )
+        .join(
+            Season_Entrant_Driver,
+            Season_Driver_Standing.driver_id == Season_Entrant_Driver.driver_id,
+        )
+        .where(Season_Driver_Standing.year == year)
+        .where(Season_Entrant_Driver.year == year)
+        .order_by(Season_Driver_Standing.position_number)
+    )
+
+
+# SeasonData field -> (query, row class)
+SEASON_QUERIES = {
+    "races": (races_query, RaceRow),
+    "constructors": (constructors_query, ConstructorRow),
+    "constructors_standing": (constructors_standing_query, ConstructorStandingRow),
+    "season_driver_standing": (season_driver_standing_query, DriverStandingRow),
+}
+
+
+def season_queries(year):
+    # same order as the SeasonData fields
+    return tuple(SEASON_QUERIES[field][0](year) for field in SeasonData._fields)
+
+
+def seasons_query():
+    return select(Season.year).order_by(Season.year.desc())
+
+
+def fetch_rows(db: Session, query, row_class):
+    # Core execution: rows come back as tuples, without ORM entities
+    return list(map(row_class._make, db.connection().execute(query)))
+
+
+async def fetch_rows_async(query, row_class):
+    return list(map(row_class._make, await async_fetch_rows(query)))
+
+
+def fetch_seasons(db: Session):
+    return fetch_rows(db, seasons_query(), SeasonRow)
+
+
+async def fetch_seasons_async():
+    return await fetch_rows_async(seasons_query(), SeasonRow)
+
+
+def fetch_season_field(db: Session, year, field):
+    query, row_class = SEASON_QUERIES[field]
+    return fetch_rows(db, query(year), row_class)
+
+
+async def fetch_season_field_async(year, field):
+    query, row_class = SEASON_QUERIES[field]
+    return await fetch_rows_async(query(year), row_class)
+
+
+def fetch_season(db: Session, year) -> SeasonData:
+    return SeasonData(
+        *(fetch_season_field(db, year, field) for field in SeasonData._fields)
+    )
+
+
+class LazySeasonData:
+    """SeasonData look-alike that runs each query on first access."""
+
+    def __init__(self, db: Session, year):
+        self._db = db
+        self._year = year
+
+    @cached_property
+    def races(self):
+        return fetch_season_field(self._db, self._year, "races")
+
+    @cached_property
+    def constructors(self):
+        return fetch_season_field(self._db, self._year, "constructors")
+
+    @cached_property
+    def constructors_standing(self):
+        return fetch_season_field(self._db, self._year, "constructors_standing")
+
+    @cached_property
+    def season_driver_standing(self):
+        return fetch_season_field(self._db, self._year, "season_driver_standing")
+
+
+def start_season_queries(year) -> dict:
+    """Start every per-season query at once; SeasonData field -> task."""
+    return {
+        field: asyncio.ensure_future(fetch_season_field_async(year, field))
+        for field in SeasonData._fields
+    }
+
+
+async def fetch_season_async(year) -> SeasonData:
+    # the per-season queries are independent, so each one gets its own
+    # connection and they run concurrently
+    results = await asyncio.gather(
+        *(fetch_season_field_async(year, field) for field in SeasonData._fields)
+    )
+    return SeasonData(*results)
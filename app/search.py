@@ -0,0 +1,130 @@
+"""Instant search over drivers, constructors, circuits and grands prix.
+
+The names are read from the f1db file once per release and folded to
+lowercase ASCII ("Räikkönen" -> "raikkonen"), so matching ignores case
+and accents. Every word of a query has to start a word of the name
+(a sorted token list and bisect); longer queries also match inside names
+through a trigram index. Entries are numbered in display order, so
+ranking only compares small tuples.
+"""
+
+import re
+import unicodedata
+from bisect import bisect_left
+from heapq import nsmallest
+
+from sqlmodel import Session, select
+
+from app.cache import DerivedCache
+from app.models.f1 import Circuit, Constructor, Driver, Grand_Prix
+from app.tables import Column, TableSpec
+
+# kind -> (label, model, searched columns; the first one is displayed)
+KINDS = {
+    "driver": ("Driver", Driver, (Driver.full_name, Driver.abbreviation)),
+    "constructor": ("Constructor", Constructor, (Constructor.full_name,)),
+    "circuit": ("Circuit", Circuit, (Circuit.full_name, Circuit.place_name)),
+    "grand_prix": ("Grand Prix", Grand_Prix, (Grand_Prix.name,)),
+}
+
+LIMIT = 10
+
+# letters NFKD does not decompose into a base letter and an accent
+FOLD = str.maketrans({"ø": "o", "đ": "d", "ł": "l", "ı": "i", "æ": "ae", "œ": "oe"})
+NON_WORD = re.compile(r"[\W_]+")
+
+# matched the start of the displayed name, the start of a word, inside a word
+_RANK = {True: 0, False: 1, None: 2}
+
+
+def normalize(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    letters = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(NON_WORD.sub(" ", letters.translate(FOLD)).split())
+
+
+def trigrams(text: str):
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    def __init__(self, rows):
+        """rows: (kind, id, displayed name, *other searched names)"""
+        order = list(KINDS)
+        rows = sorted(rows, key=lambda row: (order.index(row[0]), len(row[2]), row[2]))
+        self.entries = [(kind, id, name) for kind, id, name, *_ in rows]
+        self.names = [normalize(name) for _, _, name, *_ in rows]
+        self.texts = [
+            " ".join(normalize(name) for name in names if name) for _, _, *names in rows
+        ]
+
+        tokens = []
+        self.trigrams = {}
+        for entry, text in enumerate(self.texts):
+            tokens += [(token, entry) for token in set(text.split())]
+            for gram in trigrams(text):
+                self.trigrams.setdefault(gram, []).append(entry)
+        tokens.sort()
+        self.tokens = [token for token, _ in tokens]
+        self.token_entries = [entry for _, entry in tokens]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _prefixed(self, word):
+        start = bisect_left(self.tokens, word)
+        stop = bisect_left(self.tokens, word + "\uffff", start)
+        return set(self.token_entries[start:stop])
+
+    def _containing(self, text):
+        postings = sorted(
+            (self.trigrams.get(gram, ()) for gram in trigrams(text)), key=len
+        )
+        if not postings or not postings[0]:
+            return set()
+        candidates = set(postings[0]).intersection(*postings[1:])
+        return {entry for entry in candidates if text in self.texts[entry]}
+
+    def search(self, query: str, limit: int = LIMIT):
+        """[(kind, id, name)]: name prefixes first, then word prefixes, infixes."""
+        text = normalize(query)
+        if not text:
+            return []
+        words = sorted(text.split(), key=len, reverse=True)
+        matched = self._prefixed(words[0])
+        for word in words[1:]:
+            if not matched:
+                break
+            matched &= self._prefixed(word)
+        ranked = [(self.names[entry].startswith(text), entry) for entry in matched]
+        if len(matched) < limit and len(text) >= 3:
+            ranked += [(None, entry) for entry in self._containing(text) - matched]
+        best = nsmallest(limit, ranked, key=lambda item: (_RANK[item[0]], item[1]))
+        return [self.entries[entry] for _, entry in best]
+
+
+RESULTS_TABLE = TableSpec(Column("Name", 2), Column("Type", 0))
+
+
+def results_html(results) -> str:
+    if not results:
+        return ""
+    return RESULTS_TABLE.render_html(
+        [(KINDS[kind][0], id, name) for kind, id, name in results]
+    )
+
+
+def search_rows(db: Session):
+    connection = db.connection()
+    for kind, (_, model, columns) in KINDS.items():
+        for id, *names in connection.execute(select(model.id, *columns)):
+            yield (kind, id, *names)
+
+
+def build_search_index(db: Session) -> SearchIndex:
+    return SearchIndex(list(search_rows(db)))
+
+
+search_index_cache = DerivedCache(
+    build_search_index, lambda index: f"Built search index of {len(index)} names"
+)
@@ -0,0 +1,459 @@
+from typing import Optional
+
+import htmlgenerator as hg
+from htmlgenerator import mark_safe
+
+from app import timing
+from app.analytics import MISSING
+from app.charts import bar_chart, chart_renderer, line_chart
+from app.progression import Progression
+from app.queries import SeasonData
+from app.tables import Column, TableSpec
+
+# Charts
+
+
+def constructors_chart(season_data: SeasonData, all_time_stats):
+    return bar_chart(
+        "Constructors",
+        "Position",
+        "Points",
+        [constructor.constructor_id for constructor in season_data.constructors],
+        [
+            (
+                "Points",
+                [
+                    constructor.points
+                    for constructor in season_data.constructors_standing
+                ],
+            )
+        ],
+    )
+
+
+def constructors_podiums_chart(season_data: SeasonData, all_time_stats):
+    constructors = season_data.constructors
+    return bar_chart(
+        "Constructors",
+        "Position",
+        None,
+        [constructor.constructor_id for constructor in constructors],
+        [
+            (
+                "Total Podiums",
+                [constructor.total_podiums for constructor in constructors],
+            ),
+            (
+                "Total Race Wins",
+                [constructor.total_race_wins for constructor in constructors],
+            ),
+        ],
+    )
+
+
+def drivers_chart(season_data: SeasonData, all_time_stats):
+    season_driver_standing = season_data.season_driver_standing
+    return bar_chart(
+        "Drivers",
+        "Position",
+        "Points",
+        [driver.driver_id for driver in season_driver_standing],
+        [
+            (
+                "Points",
+                [driver.points for driver in season_driver_standing],
+            )
+        ],
+    )
+
+
+def drivers_nationality_chart(season_data, all_time_stats):
+    driver_nationality = all_time_stats.driver_nationality
+    return bar_chart(
+        "Drivers",
+        "Country",
+        "Number of drivers",
+        [driver[0] for driver in driver_nationality],
+        [("Number of drivers", [driver[1] for driver in driver_nationality])],
+        width=1300,
+        height=800,
+    )
+
+
+def engine_manufacturer_wins_chart(season_data, all_time_stats):
+    engine_manufacturer_wins = all_time_stats.engine_manufacturer_wins
+    return bar_chart(
+        "Engine Manufacturers",
+        "Manufacturer",
+        "Number of wins",
+        [engine_manufacturer[1] for engine_manufacturer in engine_manufacturer_wins],
+        [
+            (
+                "Number of wins",
+                [
+                    engine_manufacturer[0]
+                    for engine_manufacturer in engine_manufacturer_wins
+                ],
+            )
+        ],
+        width=1300,
+        height=800,
+    )
+
+
+SEASON_CHARTS = {
+    "constructors": constructors_chart,
+    "constructors_podiums": constructors_podiums_chart,
+    "drivers": drivers_chart,
+}
+
+# identical for every season
+ALL_TIME_CHARTS = {
+    "drivers_nationality": drivers_nationality_chart,
+    "engine_manufacturer_wins": engine_manufacturer_wins_chart,
+}
+
+CHARTS = {**SEASON_CHARTS, **ALL_TIME_CHARTS}
+
+
+# Tables
+
+RACES_TABLE = TableSpec(
+    Column("Date", "date"),
+    Column("Grand Prix", "official_name", empty_none=True),
+    Column("Round", "round"),
+)
+
+CONSTRUCTORS_TABLE = TableSpec(
+    Column("Pos", "position_number"),
+    Column("Constructor", "full_name", empty_none=True),
+    Column("Best Starting Grid Position", "best_starting_grid_position"),
+    Column("Best Race Result", "best_race_result"),
+    Column("Total Race Entries", "total_race_entries"),
+    Column("Total Race Starts", "total_race_starts"),
+    Column("Total Race Wins", "total_race_wins"),
+    Column("Total 1 and 2 Finishes", "total_1_and_2_finishes"),
+    Column("Total Race Laps", "total_race_laps"),
+    Column("Total Podiums", "total_podiums"),
+    Column("Total Podium Races", "total_podium_races"),
+    Column("Total Points", "total_points"),
+    Column("Total Pole Positions", "total_pole_positions"),
+    Column("Total Fastest Laps", "total_fastest_laps"),
+)
+
+CONSTRUCTORS_STANDING_TABLE = TableSpec(
+    Column("Pos", "position_number"),
+    Column("Constructor", "constructor_id", empty_none=True),
+    Column("Engine Manufacturer", "engine_manufacturer_id"),
+    Column("Points", "points"),
+)
+
+DRIVERS_STANDING_TABLE = TableSpec(
+    Column("Pos", "position_number"),
+    Column("Driver", "driver_id", empty_none=True),
+    Column("Points", "points"),
+    Column("Team", "constructor_id", empty_none=True),
+    Column("Engine Manufacturer", "engine_manufacturer_id"),
+)
+
+DRIVERS_NATIONALITY_TABLE = TableSpec(
+    Column("Country", 0),
+    Column("Number of drivers", 1),
+)
+
+ENGINE_MANUFACTURER_WINS_TABLE = TableSpec(
+    Column("Number of wins", 0),
+    Column("Engine Manufacturer", 2),
+    Column("Country", 3),
+)
+
+
+def races_table(season_data: SeasonData, all_time_stats):
+    return RACES_TABLE.render(season_data.races)
+
+
+def constructors_table(season_data: SeasonData, all_time_stats):
+    return CONSTRUCTORS_TABLE.render(season_data.constructors)
+
+
+def constructors_standing_table(season_data: SeasonData, all_time_stats):
+    return CONSTRUCTORS_STANDING_TABLE.render(season_data.constructors_standing)
+
+
+def drivers_standing_table(season_data: SeasonData, all_time_stats):
+    return DRIVERS_STANDING_TABLE.render(season_data.season_driver_standing)
+
+
+def drivers_nationality_table(season_data, all_time_stats):
+    return DRIVERS_NATIONALITY_TABLE.render(all_time_stats.driver_nationality)
+
+
+def engine_manufacturer_wins_table(season_data, all_time_stats):
+    table = ENGINE_MANUFACTURER_WINS_TABLE.render_html(
+        all_time_stats.engine_manufacturer_wins
+    )
+    return mark_safe(f"<table><tr><td>{table}</td></tr></table>")
+
+
+SEASON_TABLES = {
+    "races": races_table,
+    "constructors": constructors_table,
+    "constructors_standing": constructors_standing_table,
+    "drivers_standing": drivers_standing_table,
+}
+
+ALL_TIME_TABLES = {
+    "drivers_nationality": drivers_nationality_table,
+    "engine_manufacturer_wins": engine_manufacturer_wins_table,
+}
+
+TABLES = {**SEASON_TABLES, **ALL_TIME_TABLES}
+
+
+# Championship progression
+
+PROGRESSIONS = (
+    ("driver", "Drivers", "Driver"),
+    ("constructor", "Constructors", "Team"),
+)
+
+
+def progression_chart(title, progression: Progression):
+    return line_chart(
+        f"{title} Championship",
+        "Grand Prix",
+        "Points",
+        progression.races,
+        zip(progression.entities, progression.points.T.tolist()),
+        width=1300,
+        height=800,
+    )
+
+
+def progression_table(entity_header, progression: Progression):
+    rounds = progression.rounds.tolist()
+    spec = TableSpec(
+        Column("Pos", 0, empty_none=True),
+        Column(entity_header, 1),
+        Column("Points", 2),
+        *(
+            Column(f"R{round}", 3 + i, empty_none=True)
+            for i, round in enumerate(rounds)
+        ),
+    )
+    rows = []
+    for entity, points, positions in zip(
+        progression.entities,
+        progression.points[-1].tolist(),
+        progression.positions.T.tolist(),
+    ):
+        positions = [
+            None if position == MISSING else position for position in positions
+        ]
+        rows.append((positions[-1], entity, points, *positions))
+    return spec.render(rows)
+
+
+def progression_fragment(year: int, season: dict[str, Progression]) -> str:
+    specs = {
+        kind: progression_chart(title, season[kind])
+        for kind, title, _ in PROGRESSIONS
+        if len(season[kind])
+    }
+    svgs = chart_renderer.render_many(specs)
+    with timing.stage("html"):
+        children = [hg.H2(f"Championship Progression {year}")]
+        if not specs:
+            children.append(hg.P("No standings recorded for this season."))
+        for kind, title, entity_header in PROGRESSIONS:
+            if kind in specs:
+                children += [
+                    hg.H3(title),
+                    hg.DIV(mark_safe(svgs[kind])),
+                    progression_table(entity_header, season[kind]),
+                ]
+        return hg.render(hg.DIV(*children), {})
+
+
+# Page
+
+
+def lazy_fragment(url: str):
+    # htmx swaps the placeholder for the fragment once it scrolls into view
+    return hg.DIV(hx_get=url, hx_trigger="revealed", hx_swap="outerHTML")
+
+
+def chart_fragment(spec) -> str:
+    return chart_renderer.render(spec)
+
+
+def table_fragment(name: str, season_data, all_time_stats) -> str:
+    with timing.stage("html"):
+        return str(TABLES[name](season_data, all_time_stats))
+
+
+class SeasonPage:
+    """The /api/season fragment, renderable whole or section by section.
+
+    Sections only touch the season_data fields listed in SECTIONS, so a
+    streaming response can emit each one as soon as its query finished.
+    With lazy=True the charts and the all-years tables are left out and
+    loaded from their own fragment endpoints when scrolled into view. The
+    progression is always such a fragment unless its html is passed in.
+    """
+
+    SECTIONS = (
+        ("races", ("races",)),
+        ("constructors", ("constructors", "constructors_standing")),
+        ("constructors_standing", ("constructors_standing",)),
+        ("drivers_standing", ("season_driver_standing",)),
+        ("progression", ()),
+        ("all_time", ()),
+    )
+
+    def __init__(
+        self,
+        year: Optional[int],
+        season_data,
+        all_time_stats,
+        lazy=False,
+        progression: Optional[str] = None,
+    ):
+        self.year = year
+        self.season_data = season_data
+        self.all_time_stats = all_time_stats
+        self.lazy = lazy
+        self.progression_html = progression
+        self.svgs = {}
+
+    def prefetch_charts(self):
+        # all data is there: render every chart in parallel up front
+        if not self.lazy:
+            self.svgs.update(
+                chart_renderer.render_many(
+                    {
+                        name: chart(self.season_data, self.all_time_stats)
+                        for name, chart in CHARTS.items()
+                    }
+                )
+            )
+
+    def chart(self, *names):
+        if self.lazy:
+            return [
+                lazy_fragment(f"/api/season/{self.year}/chart/{name}") for name in names
+            ]
+        missing = {
+            name: CHARTS[name](self.season_data, self.all_time_stats)
+            for name in names
+            if name not in self.svgs
+        }
+        if missing:
+            self.svgs.update(chart_renderer.render_many(missing))
+        return [mark_safe(self.svgs[name]) for name in names]
+
+    def all_time_table(self, name):
+        if self.lazy:
+            return lazy_fragment(f"/api/season/{self.year}/table/{name}")
+        return TABLES[name](self.season_data, self.all_time_stats)
+
+    def races(self):
+        return (
+            hg.H1(f"Formula 1 Standings {str(self.year)}"),
+            hg.H2(f"Number of races: {str(len(self.season_data.races))}"),
+            races_table(self.season_data, self.all_time_stats),
+        )
+
+    def constructors(self):
+        return (
+            hg.HR(),
+            hg.DIV(
+                hg.H2(f"Constructors {str(self.year)}"),
+            ),
+            constructors_table(self.season_data, self.all_time_stats),
+            hg.DIV(*self.chart("constructors", "constructors_podiums")),
+        )
+
+    def constructors_standing(self):
+        return (
+            hg.HR(),
+            hg.DIV(hg.H2(f"Constructors Standing {str(self.year)}")),
+            constructors_standing_table(self.season_data, self.all_time_stats),
+        )
+
+    def drivers_standing(self):
+        return (
+            hg.HR(),
+            hg.DIV(hg.H2(f"Drivers Standing {str(self.year)}")),
+            hg.TABLE(
+                hg.TR(
+                    hg.TD(
+                        drivers_standing_table(self.season_data, self.all_time_stats),
+                    ),
+                    hg.TD(
+                        hg.DIV(*self.chart("drivers")),
+                    ),
+                )
+            ),
+        )
+
+    def progression(self):
+        if self.progression_html is not None:
+            return (hg.HR(), mark_safe(self.progression_html))
+        # otherwise its own fragment: it is built from the per-round standings
+        return (hg.HR(), lazy_fragment(f"/api/season/{self.year}/progression"))
+
+    def all_time(self):
+        return (
+            hg.HR(),
+            hg.H2("Other Statistics (All years)"),
+            hg.HR(),
+            hg.DIV(hg.H2("Drivers Nationality")),
+            hg.TABLE(
+                hg.TR(
+                    hg.TD(
+                        self.all_time_table("drivers_nationality"),
+                    ),
+                    hg.TD(hg.DIV(*self.chart("drivers_nationality"))),
+                ),
+            ),
+            hg.HR(),
+            hg.H2("Engine Manufacturers Wins"),
+            hg.TABLE(
+                hg.TR(
+                    hg.TD(
+                        self.all_time_table("engine_manufacturer_wins"),
+                    ),
+                    hg.TD(hg.DIV(*self.chart("engine_manufacturer_wins"))),
+                ),
+            ),
+        )
+
+    def render_section(self, name) -> str:
+        with timing.stage("html"):
+            # BaseElement: the children without a wrapping tag
+            return hg.render(hg.BaseElement(*getattr(self, name)()), {})
+
+    # the sections share one wrapping <div>, like the original page tree
+    OPEN = "<div>"
+    CLOSE = "</div>"
+
+    def stream(self):
+        yield self.OPEN
+        for name, _ in self.SECTIONS:
+            yield self.render_section(name)
+        yield self.CLOSE
+
+    def render(self) -> str:
+        self.prefetch_charts()
+        return "".join(self.stream())
+
+
+def season_page(
+    year: Optional[int],
+    season_data: SeasonData,
+    all_time_stats,
+    lazy=False,
+    progression: Optional[str] = None,
+) -> str:
+    return SeasonPage(year, season_data, all_time_stats, lazy, progression).render()
@@ -0,0 +1,80 @@
+from sqlalchemy import distinct
+from sqlalchemy.sql.functions import count
+from sqlmodel import Session, select
+
+from app.cache import DerivedCache
+from app.models.f1 import (
+    Country,
+    Driver,
+    Engine_Manufacturer,
+    Race,
+    Race_Data,
+)
+
+
+def driver_nationality_query():
+    return (
+        select(Country.name, count(Driver.nationality_country_id))
+        .join(
+            Country,
+            Driver.nationality_country_id == Country.id,
+        )
+        .group_by(Country.name)
+        .order_by(count(Driver.nationality_country_id).desc())
+    )
+
+
+def driver_nationality(db: Session):
+    return db.exec(driver_nationality_query()).all()
+
+
+def engine_manufacturer_wins_query(year_from=None, year_to=None):
+    # Race_Data already records the engine of every entry, so no join through
+    # Season_Entrant_Engine (which is per constructor *and year*) is needed
+    # a shared car has a row per driver, both with position 1: one win
+    wins = count(distinct(Race_Data.race_id))
+    query = (
+        select(
+            wins.label("wins"),
+            Race_Data.engine_manufacturer_id.label("manufacturer"),
+            Engine_Manufacturer.name.label("engine_manufacturer"),
+            Engine_Manufacturer.country_id,
+        )
+        .join(
+            Engine_Manufacturer,
+            Race_Data.engine_manufacturer_id == Engine_Manufacturer.id,
+        )
+        .where(Race_Data.type == "RACE_RESULT")
+        .where(Race_Data.position_number == 1)
+        .group_by(Race_Data.engine_manufacturer_id)
+        .order_by(wins.desc(), Engine_Manufacturer.name)
+    )
+    if year_from is not None or year_to is not None:
+        query = query.join(Race, Race.id == Race_Data.race_id)
+        if year_from is not None:
+            query = query.where(Race.year >= year_from)
+        if year_to is not None:
+            query = query.where(Race.year <= year_to)
+    return query
+
+
+def engine_manufacturer_wins(db: Session, year_from=None, year_to=None):
+    """(wins, manufacturer id, name, country id) per engine manufacturer."""
+    return db.exec(engine_manufacturer_wins_query(year_from, year_to)).all()
+
+
+class AllTimeStats:
+    def __init__(self, driver_nationality, engine_manufacturer_wins):
+        self.driver_nationality = driver_nationality
+        self.engine_manufacturer_wins = engine_manufacturer_wins
+
+
+def all_time_stats(db: Session) -> AllTimeStats:
+    return AllTimeStats(
+        [tuple(row) for row in driver_nationality(db)],
+        [tuple(row) for row in engine_manufacturer_wins(db)],
+    )
+
+
+# cross-season aggregates, computed once per f1db file
+stats_cache = DerivedCache(all_time_stats)
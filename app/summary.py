@@ -0,0 +1,341 @@
+"""Materialized per-season summaries in a derived SQLite store.
+
+    python -m app.summary [--full]
+
+Every row of a season view is stored once in season_summary, keyed by
+(year, section, ord), where section is the SeasonData field it belongs
+to: one row per race, per season and constructor (name, points, positions
+and win/podium totals), per constructor standing entry and per driver
+standing entry (driver, constructor and engine manufacturer names and the
+driver's season wins and podiums). A section only fills its own columns,
+so the app reads a whole season with a single primary-key range scan.
+Every season's rows are read from the f1db file and hashed, and only
+seasons whose hash changed are written, which between releases is
+usually just the latest season.
+
+With F1STATS_USE_SUMMARY_DB=1 the store is brought up to date at startup,
+before the first request.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from sqlmodel import Session, select
+
+from app import config, database, timing
+from app.models.f1 import Constructor, Driver, Engine_Manufacturer, Season_Driver
+from app.queries import (
+    ConstructorRow,
+    ConstructorStandingRow,
+    DriverStandingRow,
+    RaceRow,
+    SeasonData,
+    fetch_season,
+    fetch_season_async,
+    fetch_seasons,
+)
+
+META_TABLE = "f1stats_summary"
+
+# column -> type: the fields of every section's row class, then the joined
+# names, which only other readers use; a section leaves the rest NULL
+SUMMARY_COLUMNS = {
+    "date": "TEXT",
+    "official_name": "TEXT",
+    "round": "INTEGER",
+    "position_number": "INTEGER",
+    "driver_id": "TEXT",
+    "constructor_id": "TEXT",
+    "engine_manufacturer_id": "TEXT",
+    "points": "REAL",
+    "full_name": "TEXT",
+    "best_starting_grid_position": "INTEGER",
+    "best_race_result": "INTEGER",
+    "total_race_entries": "INTEGER",
+    "total_race_starts": "INTEGER",
+    "total_race_wins": "INTEGER",
+    "total_1_and_2_finishes": "INTEGER",
+    "total_race_laps": "INTEGER",
+    "total_podiums": "INTEGER",
+    "total_podium_races": "INTEGER",
+    "total_points": "REAL",
+    "total_pole_positions": "INTEGER",
+    "total_fastest_laps": "INTEGER",
+    "driver_name": "TEXT",
+    "constructor_name": "TEXT",
+    "engine_manufacturer_name": "TEXT",
+}
+
+SCHEMA = (
+    f"CREATE TABLE IF NOT EXISTS {META_TABLE} (key TEXT PRIMARY KEY, value TEXT)",
+    """CREATE TABLE IF NOT EXISTS season_fingerprint (
+        year INTEGER PRIMARY KEY,
+        fingerprint TEXT NOT NULL
+    )""",
+    f"""CREATE TABLE IF NOT EXISTS season_summary (
+        year INTEGER NOT NULL,
+        section TEXT NOT NULL,
+        ord INTEGER NOT NULL,
+        {", ".join(f"{name} {type}" for name, type in SUMMARY_COLUMNS.items())},
+        PRIMARY KEY (year, section, ord)
+    ) WITHOUT ROWID""",
+)
+
+# SeasonData field (the section) -> row class
+SECTION_ROWS = {
+    "races": RaceRow,
+    "constructors": ConstructorRow,
+    "constructors_standing": ConstructorStandingRow,
+    "season_driver_standing": DriverStandingRow,
+}
+
+# position of each row class field in a "SELECT section, <columns>" row
+SECTION_INDEXES = {
+    section: [1 + list(SUMMARY_COLUMNS).index(name) for name in row_class._fields]
+    for section, row_class in SECTION_ROWS.items()
+}
+
+READ_SEASON = (
+    f"SELECT section, {', '.join(SUMMARY_COLUMNS)} FROM season_summary "
+    "WHERE year = ? ORDER BY section, ord"
+)
+
+
+def summary_lookups(db: Session):
+    """Names and season driver totals joined into the summary rows."""
+    connection = db.connection()
+    return {
+        "driver": dict(connection.execute(select(Driver.id, Driver.name)).all()),
+        "constructor": dict(
+            connection.execute(select(Constructor.id, Constructor.full_name)).all()
+        ),
+        "engine_manufacturer": dict(
+            connection.execute(
+                select(Engine_Manufacturer.id, Engine_Manufacturer.name)
+            ).all()
+        ),
+        "season_driver": {
+            (year, driver_id): (wins, podiums)
+            for year, driver_id, wins, podiums in connection.execute(
+                select(
+                    Season_Driver.year,
+                    Season_Driver.driver_id,
+                    Season_Driver.total_race_wins,
+                    Season_Driver.total_podiums,
+                )
+            )
+        },
+    }
+
+
+def _row_columns(year, row, lookups):
+    return row._asdict()
+
+
+def _race_columns(year, row, lookups):
+    # SQLite has no date type
+    return {**row._asdict(), "date": row.date.isoformat()}
+
+
+def _constructor_standing_columns(year, row, lookups):
+    return {
+        **row._asdict(),
+        "constructor_name": lookups["constructor"].get(row.constructor_id),
+        "engine_manufacturer_name": lookups["engine_manufacturer"].get(
+            row.engine_manufacturer_id
+        ),
+    }
+
+
+def _driver_columns(year, row, lookups):
+    wins, podiums = lookups["season_driver"].get((year, row.driver_id), (None, None))
+    return {
+        **row._asdict(),
+        "driver_name": lookups["driver"].get(row.driver_id),
+        "constructor_name": lookups["constructor"].get(row.constructor_id),
+        "engine_manufacturer_name": lookups["engine_manufacturer"].get(
+            row.engine_manufacturer_id
+        ),
+        "total_race_wins": wins,
+        "total_podiums": podiums,
+    }
+
+
+COLUMNS = {
+    "races": _race_columns,
+    "constructors": _row_columns,
+    "constructors_standing": _constructor_standing_columns,
+    "season_driver_standing": _driver_columns,
+}
+
+
+def season_rows(year, season_data: SeasonData, lookups):
+    """[(year, section, ord, *SUMMARY_COLUMNS)] of one season."""
+    rows = []
+    for section, section_rows in season_data._asdict().items():
+        for ord, row in enumerate(section_rows):
+            columns = COLUMNS[section](year, row, lookups)
+            rows.append(
+                (year, section, ord, *(columns.get(name) for name in SUMMARY_COLUMNS))
+            )
+    return rows
+
+
+def fingerprint(rows) -> str:
+    # exactly what is stored, so any change to a displayed or joined column
+    # (a renamed constructor, a moved round) rebuilds the season
+    return hashlib.sha1(repr(rows).encode()).hexdigest()
+
+
+def build(db: Session, path: str, full=False):
+    """Bring the summary store at `path` up to date with the f1db file."""
+    started = time.perf_counter()
+    tables = ["season_summary", "season_fingerprint"]
+    store = sqlite3.connect(path)
+    try:
+        for statement in SCHEMA:
+            store.execute(statement)
+        if full:
+            for table in tables:
+                store.execute(f"DELETE FROM {table}")
+        stored = dict(store.execute("SELECT year, fingerprint FROM season_fingerprint"))
+        lookups = summary_lookups(db)
+        seasons = {
+            year: season_rows(year, fetch_season(db, year), lookups)
+            for (year,) in fetch_seasons(db)
+        }
+        current = {year: fingerprint(rows) for year, rows in seasons.items()}
+
+        changed = sorted(
+            year
+            for year, fingerprint in current.items()
+            if stored.get(year) != fingerprint
+        )
+        removed = sorted(set(stored) - set(current))
+        for year in removed + changed:
+            for table in tables:
+                store.execute(f"DELETE FROM {table} WHERE year = ?", (year,))
+        placeholders = ", ".join("?" * (3 + len(SUMMARY_COLUMNS)))
+        for year in changed:
+            store.executemany(
+                f"INSERT INTO season_summary VALUES ({placeholders})", seasons[year]
+            )
+            store.execute(
+                "INSERT INTO season_fingerprint VALUES (?, ?)", (year, current[year])
+            )
+        store.execute(
+            f"INSERT OR REPLACE INTO {META_TABLE} VALUES ('source_version', ?)",
+            (database.file_version(config.DB_PATH),),
+        )
+        store.commit()
+    finally:
+        store.close()
+    print(
+        f"Summary {path}: {len(changed)} seasons rebuilt, {len(removed)} removed, "
+        f"{len(current) - len(changed)} unchanged "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
+    return changed
+
+
+def build_summary(db: Session):
+    """Startup build; a failure only means seasons are read from f1db."""
+    try:
+        build(db, config.SUMMARY_DB_PATH)
+    except (sqlite3.Error, OSError) as e:
+        print(
+            f"Building {config.SUMMARY_DB_PATH} failed ({e}), reading seasons from f1db"
+        )
+
+
+class SummaryStore:
+    """Read side of the summary store, used when F1STATS_USE_SUMMARY_DB is set."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._checked_version = None
+        self._years = None
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(database.sqlite_uri(self.path), uri=True)
+            self._local.connection = connection
+        return connection
+
+    def available(self):
+        if not config.USE_SUMMARY_DB:
+            return False
+        version = database.db_version()
+        if version != self._checked_version:
+            self._checked_version = version
+            self._years = None
+            self._local = threading.local()
+            # only valid for the f1db file it was built from
+            if os.path.exists(self.path) and database.derived_source_version(
+                self.path, META_TABLE
+            ) == database.file_version(config.DB_PATH):
+                self._years = {
+                    year
+                    for (year,) in self._connection().execute(
+                        "SELECT year FROM season_fingerprint"
+                    )
+                }
+            else:
+                print(f"{self.path} is missing or stale, reading seasons from f1db")
+        return self._years is not None
+
+    def read(self, year) -> SeasonData | None:
+        if not self.available() or year not in self._years:
+            return None
+        sections = {section: [] for section in SECTION_ROWS}
+        with timing.stage("db"):
+            for row in self._connection().execute(READ_SEASON, (year,)):
+                sections[row[0]].append(row)
+        return SeasonData(
+            **{
+                section: [
+                    SECTION_ROWS[section]._make(
+                        row[i] for i in SECTION_INDEXES[section]
+                    )
+                    for row in rows
+                ]
+                for section, rows in sections.items()
+            }
+        )
+
+
+summary_store = SummaryStore(config.SUMMARY_DB_PATH)
+
+
+def load_season(db: Session, year) -> SeasonData:
+    season_data = summary_store.read(year)
+    if season_data is None:
+        season_data = fetch_season(db, year)
+    return season_data
+
+
+async def load_season_async(year) -> SeasonData:
+    season_data = await asyncio.to_thread(summary_store.read, year)
+    if season_data is None:
+        season_data = await fetch_season_async(year)
+    return season_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the per-season summary store")
+    parser.add_argument("--out", default=config.SUMMARY_DB_PATH)
+    parser.add_argument("--full", action="store_true", help="rebuild every season")
+    args = parser.parse_args()
+    with database.open_db() as db:
+        build(db, args.out, args.full)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""HTML tables rendered straight from row tuples.
+
+A TableSpec compiles the header and a row template once; rendering a table
+is then one format call per row, without building an htmlgenerator element
+per cell. The markup is the same hg.TABLE/THEAD/TBODY/TR/TD output.
+"""
+
+from html import escape
+from operator import attrgetter, itemgetter
+from typing import NamedTuple
+
+from htmlgenerator import mark_safe
+
+PURE_TABLE = "pure-table pure-table-bordered"
+
+
+class Column(NamedTuple):
+    header: str
+    # attribute name on row objects, or index into plain tuples
+    field: str | int
+    # hg renders a None child as nothing, while str(None) gives "None"
+    empty_none: bool = False
+
+
+class TableSpec:
+    def __init__(self, *columns: Column, css_class: str = PURE_TABLE):
+        self.columns = columns
+        headers = "".join(f"<th>{escape(column.header)}</th>" for column in columns)
+        self.head = (
+            f'<table class="{escape(css_class)}">'
+            f"<thead><tr>{headers}</tr></thead><tbody>"
+        )
+        self.tail = "</tbody></table>"
+        self.row = "<tr>" + "<td>{}</td>" * len(columns) + "</tr>"
+        self.cells = [
+            (
+                (
+                    attrgetter(column.field)
+                    if isinstance(column.field, str)
+                    else itemgetter(column.field)
+                ),
+                column.empty_none,
+            )
+            for column in columns
+        ]
+
+    def render_html(self, rows) -> str:
+        row = self.row.format
+        cells = self.cells
+        parts = [self.head]
+        for values in rows:
+            texts = []
+            for get, empty_none in cells:
+                value = get(values)
+                texts.append("" if value is None and empty_none else escape(str(value)))
+            parts.append(row(*texts))
+        parts.append(self.tail)
+        return "".join(parts)
+
+    def render(self, rows):
+        """Pre-rendered markup that can be used as a child of hg elements."""
+        return mark_safe(self.render_html(rows))
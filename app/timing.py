@@ -0,0 +1,262 @@
+"""Per-request stage timings: Server-Timing headers and /metrics.
+
+Stages are measured with `stage(name)` (chart rendering, HTML rendering)
+and SQLAlchemy cursor events (db). A stage opened inside another one is
+not counted twice: the outer stage only gets its own time. TimingMiddleware
+adds a Server-Timing header to every response and feeds the histograms that
+`/metrics` exposes in the Prometheus text format, together with the bytes
+sent per route and content encoding.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from app import config
+
+# seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Timings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.queries = 0
+        self.identity_bytes = None  # uncompressed size of a compressed body
+        self._open = []  # time spent in nested stages, per open stage
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        if self._open:
+            self._open[-1] += seconds
+
+    def server_timing(self, total):
+        entries = []
+        for name, seconds in self.stages.items():
+            desc = ""
+            if name == "db" and self.queries:
+                desc = f';desc="{self.queries} queries"'
+            entries.append(f"{name}{desc};dur={seconds * 1000:.2f}")
+        entries.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(entries)
+
+
+_timings: ContextVar[Timings | None] = ContextVar("f1stats_timings", default=None)
+
+
+@contextmanager
+def stage(name):
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    timings._open.append(0.0)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        nested = timings._open.pop()
+        timings.add(name, time.perf_counter() - started - nested)
+
+
+def record_identity_bytes(size):
+    timings = _timings.get()
+    if timings is not None:
+        timings.identity_bytes = size
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # kept on the statement's own context: one that raises never reaches
+    # after_cursor_execute, and a per-connection stack would keep its entry
+    context.f1stats_query_start = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = context.f1stats_query_start
+    timings = _timings.get()
+    if timings is not None:
+        timings.queries += 1
+        timings.add("db", time.perf_counter() - started)
+
+
+def _labels(names, label_values, **extra):
+    pairs = [*zip(names, label_values), *extra.items()]
+    escaped = (
+        (name, str(value).replace("\\", r"\\").replace('"', r"\""))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Histogram:
+    def __init__(self, name, help, labels, buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}  # label values -> [bucket counts, sum, count]
+
+    def observe(self, label_values, seconds):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def _labels(self, label_values, **extra):
+        return _labels(self.labels, label_values, **extra)
+
+    def exposition(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted(self._series.items())
+            series = [
+                (values, (counts[:], total, count))
+                for values, (counts, total, count) in series
+            ]
+        for label_values, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                labels = self._labels(label_values, le=bound)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = self._labels(label_values, le="+Inf")
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            lines.append(f"{self.name}_sum{self._labels(label_values)} {total}")
+            lines.append(f"{self.name}_count{self._labels(label_values)} {count}")
+        return "\n".join(lines)
+
+
+class Counter:
+    def __init__(self, name, help, labels):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._series = {}  # label values -> total
+
+    def inc(self, label_values, amount=1):
+        with self._lock:
+            self._series[label_values] = self._series.get(label_values, 0) + amount
+
+    def values(self):
+        with self._lock:
+            return dict(self._series)
+
+    def exposition(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for label_values, total in sorted(self.values().items()):
+            lines.append(f"{self.name}{_labels(self.labels, label_values)} {total}")
+        return "\n".join(lines)
+
+
+request_duration = Histogram(
+    "f1stats_request_duration_seconds",
+    "Time from request to the last body chunk.",
+    ("route", "method", "status"),
+)
+stage_duration = Histogram(
+    "f1stats_stage_duration_seconds",
+    "Time per request spent in each stage (db, chart, html).",
+    ("route", "stage"),
+)
+response_bytes = Counter(
+    "f1stats_response_bytes_total",
+    "Response body bytes sent, by content encoding.",
+    ("route", "encoding"),
+)
+response_identity_bytes = Counter(
+    "f1stats_response_identity_bytes_total",
+    "Response body bytes before compression.",
+    ("route",),
+)
+METRICS = (
+    request_duration,
+    stage_duration,
+    response_bytes,
+    response_identity_bytes,
+)
+
+
+def metrics_text():
+    return "\n".join(metric.exposition() for metric in METRICS) + "\n"
+
+
+def compression_ratios():
+    """Bytes sent against uncompressed bytes, per route."""
+    sent = {}
+    for (route, _), size in response_bytes.values().items():
+        sent[route] = sent.get(route, 0) + size
+    ratios = {}
+    for (route,), identity in sorted(response_identity_bytes.values().items()):
+        ratios[route] = {
+            "identity_bytes": identity,
+            "sent_bytes": sent.get(route, 0),
+            "ratio": round(sent.get(route, 0) / identity, 4) if identity else None,
+        }
+    return ratios
+
+
+def route_label(scope):
+    # the path template, so /api/season/2005/chart/drivers is one series
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class TimingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not config.TIMING:
+            await self.app(scope, receive, send)
+            return
+
+        timings = Timings()
+        token = _timings.set(timings)
+        status = 500
+        encoding = "identity"
+        sent = 0
+
+        async def send_with_timing(message):
+            nonlocal status, encoding, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"content-encoding":
+                        encoding = value.decode("latin-1")
+                total = time.perf_counter() - timings.started
+                headers = list(message.get("headers", []))
+                headers.append(
+                    (b"server-timing", timings.server_timing(total).encode("latin-1"))
+                )
+                message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _timings.reset(token)
+            route = route_label(scope)
+            request_duration.observe(
+                (route, scope["method"], str(status)),
+                time.perf_counter() - timings.started,
+            )
+            for name, seconds in timings.stages.items():
+                stage_duration.observe((route, name), seconds)
+            if sent:
+                response_bytes.inc((route, encoding), sent)
+                identity = timings.identity_bytes
+                if identity is None or encoding == "identity":
+                    identity = sent
+                response_identity_bytes.inc((route,), identity)
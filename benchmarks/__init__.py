@@ -0,0 +1,12 @@
+import statistics
+import time
+
+
+def median_ms(fn, repeat):
+    """Median wall time of `repeat` calls of fn(), in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
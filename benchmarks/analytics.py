@@ -0,0 +1,79 @@
+"""SQL group-by vs. the columnar Race_Data in app.analytics.
+
+    python -m benchmarks.analytics [--repeat 200]
+
+Reports median latency of each statistic per constructor, over all years.
+"""
+
+import argparse
+import time
+
+from sqlalchemy import and_, distinct, func
+from sqlmodel import select
+
+from app.analytics import STATISTICS, aggregate, load_race_data
+from app.database import open_db
+from app.models.f1 import Race, Race_Data
+from benchmarks import median_ms
+
+RACE_RESULT = Race_Data.type == "RACE_RESULT"
+
+# the same statistics as joins over race_data, as a new stats page would do it
+SQL_STATISTICS = {
+    "wins": (
+        func.count(distinct(Race_Data.race_id)),
+        and_(RACE_RESULT, Race_Data.position_number == 1),
+    ),
+    "podiums": (
+        func.count(),
+        and_(RACE_RESULT, Race_Data.position_number.between(1, 3)),
+    ),
+    "points": (
+        func.total(Race_Data.race_points),
+        Race_Data.type.in_(["RACE_RESULT", "SPRINT_RACE_RESULT"]),
+    ),
+    "fastest_laps": (func.count(), and_(RACE_RESULT, Race_Data.race_fastest_lap)),
+    "pole_positions": (
+        func.count(),
+        and_(Race_Data.type == "QUALIFYING_RESULT", Race_Data.position_number == 1),
+    ),
+}
+
+
+def sql_aggregate(db, statistic):
+    value, where = SQL_STATISTICS[statistic]
+    query = (
+        select(Race_Data.constructor_id, value)
+        .join(Race, Race.id == Race_Data.race_id)
+        .where(where)
+        .group_by(Race_Data.constructor_id)
+        .order_by(value.desc())
+    )
+    return db.connection().execute(query).all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with open_db() as db:
+        started = time.perf_counter()
+        columns = load_race_data(db)
+        print(
+            f"Loaded {len(columns)} rows ({columns.nbytes / 1024 / 1024:.1f} MiB) "
+            f"in {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+        for statistic in STATISTICS:
+            sql = median_ms(lambda: sql_aggregate(db, statistic), args.repeat)
+            numpy = median_ms(
+                lambda: aggregate(columns, statistic, "constructor"), args.repeat
+            )
+            print(
+                f"  {statistic:<16} sql {sql:8.3f} ms  numpy {numpy:8.3f} ms  "
+                f"{sql / numpy:6.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
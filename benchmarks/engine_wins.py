@@ -0,0 +1,114 @@
+"""The old constructor-only engine wins join vs. app.stats.engine_manufacturer_wins.
+
+    python -m benchmarks.engine_wins [--repeat 50]
+
+Reports the rows feeding the GROUP BY, SQLite VM steps, median latency and
+the total number of wins each query counts (one per race is correct).
+"""
+
+import argparse
+import sqlite3
+
+from sqlalchemy import func
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.sql.functions import count
+from sqlmodel import select
+
+from app import config
+from app.database import sqlite_uri
+from app.models.f1 import (
+    Constructor,
+    Engine,
+    Engine_Manufacturer,
+    Race_Data,
+    Season_Entrant_Engine,
+)
+from app.stats import engine_manufacturer_wins_query
+from benchmarks import median_ms
+
+# progress handler granularity, in VM instructions
+STEP = 100
+
+
+def constructor_join_query():
+    # the query app.stats used before: every win is repeated once per season
+    # the constructor ever raced with that manufacturer's engine
+    return (
+        select(
+            count(Race_Data.race_id).label("wins"),
+            Season_Entrant_Engine.engine_manufacturer_id.label("manufacturer"),
+            Engine_Manufacturer.name.label("engine_manufacturer"),
+            Engine_Manufacturer.country_id,
+        )
+        .join(Constructor, Race_Data.constructor_id == Constructor.id)
+        .join(
+            Season_Entrant_Engine,
+            Season_Entrant_Engine.constructor_id == Constructor.id,
+        )
+        .join(Engine, Season_Entrant_Engine.engine_id == Engine.id)
+        .join(
+            Engine_Manufacturer,
+            Season_Entrant_Engine.engine_manufacturer_id == Engine_Manufacturer.id,
+        )
+        .where(Race_Data.position_number == 1)
+        .group_by(Season_Entrant_Engine.engine_manufacturer_id)
+        .order_by(count(Race_Data.race_id).desc())
+    )
+
+
+def compile_sql(query):
+    return str(
+        query.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True})
+    )
+
+
+def joined_rows(connection, query):
+    # the same FROM/WHERE without GROUP BY: rows the aggregation has to visit
+    ungrouped = query.group_by(None).order_by(None).with_only_columns(func.count())
+    return connection.execute(compile_sql(ungrouped)).fetchone()[0]
+
+
+def vm_steps(connection, sql):
+    steps = 0
+
+    def progress():
+        nonlocal steps
+        steps += STEP
+        return 0
+
+    connection.set_progress_handler(progress, STEP)
+    try:
+        connection.execute(sql).fetchall()
+    finally:
+        connection.set_progress_handler(None, STEP)
+    return steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=config.DB_PATH)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(sqlite_uri(args.db), uri=True)
+    races = connection.execute(
+        "SELECT count(DISTINCT race_id) FROM race_data "
+        "WHERE type = 'RACE_RESULT' AND position_number = 1"
+    ).fetchone()[0]
+    print(f"{args.db}: {races} races won")
+    for name, query in (
+        ("constructor join", constructor_join_query()),
+        ("race_data engine", engine_manufacturer_wins_query()),
+    ):
+        sql = compile_sql(query)
+        wins = sum(row[0] for row in connection.execute(sql))
+        print(
+            f"  {name:<17} rows {joined_rows(connection, query):9d}  "
+            f"vm steps ~{vm_steps(connection, sql):11d}  "
+            f"{median_ms(lambda: connection.execute(sql).fetchall(), args.repeat):8.3f} ms  wins {wins}"
+        )
+    connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,597 @@
+"""Synthetic f1db database for benchmarks.
+
+    python -m benchmarks.fixture --out datastore/f1db-synthetic.db \\
+        [--seasons 75] [--races 20] [--constructors 10] [--drivers-per-constructor 2]
+
+The schema comes from app/models/f1.py. Every table the app reads is
+filled consistently (race results, qualifying, per-race and per-season
+standings, season entrants), so the pages render like they do with the real
+f1db file. Columns the app does not read get type-appropriate filler values.
+"""
+
+import argparse
+import datetime
+import os
+import random
+import sqlite3
+import time
+import unicodedata
+
+from sqlmodel import create_engine
+
+# imported from the models module so every table is registered
+from app.models.f1 import SQLModel
+
+POINTS = (25, 18, 15, 12, 10, 8, 6, 4, 2, 1)
+
+COUNTRIES = (
+    ("italy", "Italy", "europe"),
+    ("united-kingdom", "United Kingdom", "europe"),
+    ("germany", "Germany", "europe"),
+    ("france", "France", "europe"),
+    ("brazil", "Brazil", "south-america"),
+    ("argentina", "Argentina", "south-america"),
+    ("finland", "Finland", "europe"),
+    ("spain", "Spain", "europe"),
+    ("mexico", "Mexico", "north-america"),
+    ("japan", "Japan", "asia"),
+    ("australia", "Australia", "oceania"),
+    ("austria", "Austria", "europe"),
+)
+
+FIRST_NAMES = (
+    "Alain",
+    "Ayrton",
+    "Niki",
+    "Jochen",
+    "Kimi",
+    "Sébastien",
+    "José",
+    "Jüri",
+    "Mika",
+    "Nico",
+    "Sergio",
+    "Zoë",
+    "François",
+    "Håkan",
+    "Emerson",
+    "Jenson",
+)
+LAST_NAMES = (
+    "Räikkönen",
+    "Pérez",
+    "Hülkenberg",
+    "Prost",
+    "Senna",
+    "Lauda",
+    "Rindt",
+    "Häkkinen",
+    "Fangio",
+    "Ascari",
+    "Villeneuve",
+    "Brabham",
+    "Piquet",
+    "Button",
+    "Alonso",
+    "Coulthard",
+    "Schumacher",
+    "Vettel",
+    "Giacomelli",
+    "Boutsen",
+)
+
+ENGINE_MANUFACTURERS = (
+    "Ferrari",
+    "Mercedes",
+    "Renault",
+    "Honda",
+    "Ford",
+    "BMW",
+    "Cosworth",
+    "Alfa Romeo",
+    "Climax",
+    "Matra",
+)
+
+CONSTRUCTOR_NAMES = (
+    "Ferrari",
+    "McLaren",
+    "Williams",
+    "Lotus",
+    "Brabham",
+    "Tyrrell",
+    "Ligier",
+    "March",
+    "Benetton",
+    "Jordan",
+    "Minardi",
+    "Arrows",
+    "Sauber",
+    "Renault",
+    "Cooper",
+    "BRM",
+    "Maserati",
+    "Vanwall",
+    "Surtees",
+    "Shadow",
+)
+
+
+def slug(name):
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore")
+    return "-".join(ascii_name.decode().lower().split())
+
+
+def _filler(column):
+    python_type = column.type.python_type
+    if python_type is bool:
+        return False
+    if python_type in (int, float):
+        return 0
+    if python_type is datetime.date:
+        return "1970-01-01"
+    return ""
+
+
+def insert(connection, table, rows):
+    columns = SQLModel.metadata.tables[table].columns
+    names = [column.name for column in columns]
+    filler = {
+        column.name: _filler(column)
+        for column in columns
+        if not column.nullable and not column.primary_key
+    }
+    connection.executemany(
+        f"INSERT INTO {table} ({', '.join(names)}) "
+        f"VALUES ({', '.join('?' * len(names))})",
+        [tuple(row.get(name, filler.get(name)) for name in names) for row in rows],
+    )
+
+
+def _standings(points):
+    # position_display_order, position_number, position_text, key, points
+    ranked = sorted(points.items(), key=lambda item: -item[1])
+    return [
+        (position, position, str(position), key, value)
+        for position, (key, value) in enumerate(ranked, start=1)
+    ]
+
+
+class Generator:
+    def __init__(self, connection, args):
+        self.connection = connection
+        self.args = args
+        self.random = random.Random(args.seed)
+        self.race_id = 0
+        self.counts = {}
+
+    def insert(self, table, rows):
+        insert(self.connection, table, rows)
+        self.counts[table] = self.counts.get(table, 0) + len(rows)
+
+    def reference_data(self):
+        self.insert(
+            "country",
+            [
+                {
+                    "id": id,
+                    "alpha2_code": id[:2].upper(),
+                    "alpha3_code": id[:3].upper(),
+                    "name": name,
+                    "demonym": name,
+                    "continent_id": continent,
+                }
+                for id, name, continent in COUNTRIES
+            ],
+        )
+        self.engine_manufacturers = [slug(name) for name in ENGINE_MANUFACTURERS]
+        self.insert(
+            "engine_manufacturer",
+            [
+                {
+                    "id": slug(name),
+                    "name": name,
+                    "country_id": COUNTRIES[i % len(COUNTRIES)][0],
+                }
+                for i, name in enumerate(ENGINE_MANUFACTURERS)
+            ],
+        )
+        self.insert(
+            "engine",
+            [
+                {
+                    "id": f"{id}-v8",
+                    "engine_manufacturer_id": id,
+                    "name": "V8",
+                    "full_name": f"{name} V8",
+                }
+                for id, name in zip(self.engine_manufacturers, ENGINE_MANUFACTURERS)
+            ],
+        )
+
+        constructors = self.args.constructors * 2
+        self.constructors = []
+        rows = []
+        for i in range(constructors):
+            name = CONSTRUCTOR_NAMES[i % len(CONSTRUCTOR_NAMES)]
+            if i >= len(CONSTRUCTOR_NAMES):
+                name = f"{name} {i // len(CONSTRUCTOR_NAMES) + 1}"
+            self.constructors.append(slug(name))
+            rows.append(
+                {
+                    "id": slug(name),
+                    "name": name,
+                    "full_name": f"{name} Racing Team",
+                    "country_id": COUNTRIES[i % len(COUNTRIES)][0],
+                }
+            )
+        self.insert("constructor", rows)
+        self.insert(
+            "entrant", [{"id": row["id"], "name": row["full_name"]} for row in rows]
+        )
+
+        # careers of about five seasons
+        seats = self.args.constructors * self.args.drivers_per_constructor
+        drivers = max(seats * 2, seats * self.args.seasons // 5)
+        self.drivers = []
+        rows = []
+        for i in range(drivers):
+            first = FIRST_NAMES[i % len(FIRST_NAMES)]
+            last = LAST_NAMES[(i // len(FIRST_NAMES) + i) % len(LAST_NAMES)]
+            id = slug(f"{first} {last} {i}")
+            country = COUNTRIES[self.random.randrange(len(COUNTRIES))][0]
+            self.drivers.append(id)
+            rows.append(
+                {
+                    "id": id,
+                    "name": f"{first} {last}",
+                    "first_name": first,
+                    "last_name": last,
+                    "full_name": f"{first} {last}",
+                    "abbreviation": last[:3].upper(),
+                    "gender": "MALE",
+                    "date_of_birth": "1970-01-01",
+                    "place_of_birth": "Somewhere",
+                    "country_of_birth_country_id": country,
+                    "nationality_country_id": country,
+                }
+            )
+        self.insert("driver", rows)
+        self.driver_numbers = {id: str(i % 99 + 1) for i, id in enumerate(self.drivers)}
+
+        circuits = [f"circuit-{i}" for i in range(1, 31)]
+        self.grands_prix = [f"grand-prix-{i}" for i in range(1, 31)]
+        self.circuits = circuits
+        self.insert(
+            "circuit",
+            [
+                {
+                    "id": id,
+                    "name": id.title(),
+                    "full_name": f"{id.title()} Autodrome",
+                    "type": "RACE",
+                    "place_name": "Somewhere",
+                    "country_id": COUNTRIES[i % len(COUNTRIES)][0],
+                }
+                for i, id in enumerate(circuits)
+            ],
+        )
+        self.insert(
+            "grand_prix",
+            [
+                {
+                    "id": id,
+                    "name": id.title(),
+                    "full_name": f"{id.title()} Grand Prix",
+                    "short_name": id.title(),
+                    "abbreviation": f"G{i:02d}",
+                    "country_id": COUNTRIES[i % len(COUNTRIES)][0],
+                }
+                for i, id in enumerate(self.grands_prix)
+            ],
+        )
+
+    def season(self, index, year):
+        args = self.args
+        rotate = index % len(self.constructors)
+        constructors = (self.constructors + self.constructors)[
+            rotate : rotate + args.constructors
+        ]
+        seats = args.constructors * args.drivers_per_constructor
+        start = index * len(self.drivers) // max(args.seasons, 1)
+        pool = (self.drivers[start:] + self.drivers[:start])[: seats + seats // 2]
+        self.random.shuffle(pool)
+
+        entries = []  # (driver, constructor, engine manufacturer)
+        engines = {}
+        for i, constructor in enumerate(constructors):
+            engine = self.engine_manufacturers[
+                (i + index // 4) % len(self.engine_manufacturers)
+            ]
+            engines[constructor] = engine
+            for seat in range(args.drivers_per_constructor):
+                driver = pool[i * args.drivers_per_constructor + seat]
+                entries.append((driver, constructor, engine))
+
+        self.insert("season", [{"year": year}])
+        self.insert(
+            "season_entrant_engine",
+            [
+                {
+                    "year": year,
+                    "entrant_id": constructor,
+                    "constructor_id": constructor,
+                    "engine_manufacturer_id": engine,
+                    "engine_id": f"{engine}-v8",
+                }
+                for constructor, engine in engines.items()
+            ],
+        )
+        self.insert(
+            "season_entrant_driver",
+            [
+                {
+                    "year": year,
+                    "entrant_id": constructor,
+                    "constructor_id": constructor,
+                    "engine_manufacturer_id": engine,
+                    "driver_id": driver,
+                    "test_driver": False,
+                }
+                for driver, constructor, engine in entries
+            ],
+        )
+
+        driver_points = {driver: 0.0 for driver, _, _ in entries}
+        constructor_points = {constructor: 0.0 for constructor in constructors}
+        totals = {
+            constructor: {
+                "total_race_entries": 0,
+                "total_race_starts": 0,
+                "total_race_wins": 0,
+                "total_1_and_2_finishes": 0,
+                "total_race_laps": 0,
+                "total_podiums": 0,
+                "total_podium_races": 0,
+                "total_pole_positions": 0,
+                "total_fastest_laps": 0,
+                "best_starting_grid_position": None,
+                "best_race_result": None,
+            }
+            for constructor in constructors
+        }
+        for number in range(1, args.races + 1):
+            self.race(year, number, entries, driver_points, constructor_points, totals)
+
+        self.insert(
+            "season_driver_standing",
+            [
+                {
+                    "year": year,
+                    "position_display_order": order,
+                    "position_number": number,
+                    "position_text": text,
+                    "driver_id": driver,
+                    "points": points,
+                }
+                for order, number, text, driver, points in _standings(driver_points)
+            ],
+        )
+        constructor_standings = _standings(constructor_points)
+        self.insert(
+            "season_constructor_standing",
+            [
+                {
+                    "year": year,
+                    "position_display_order": order,
+                    "position_number": number,
+                    "position_text": text,
+                    "constructor_id": constructor,
+                    "engine_manufacturer_id": engines[constructor],
+                    "points": points,
+                }
+                for order, number, text, constructor, points in constructor_standings
+            ],
+        )
+        self.insert(
+            "season_constructor",
+            [
+                {
+                    "year": year,
+                    "constructor_id": constructor,
+                    "position_number": number,
+                    "position_text": text,
+                    "total_points": points,
+                    **totals[constructor],
+                }
+                for _, number, text, constructor, points in constructor_standings
+            ],
+        )
+
+    def race(self, year, number, entries, driver_points, constructor_points, totals):
+        self.race_id += 1
+        race_id = self.race_id
+        day = (number - 1) * 270 // max(self.args.races, 1)
+        self.insert(
+            "race",
+            [
+                {
+                    "id": race_id,
+                    "year": year,
+                    "round": number,
+                    "date": (
+                        datetime.date(year, 3, 1) + datetime.timedelta(days=day)
+                    ).isoformat(),
+                    "grand_prix_id": self.grands_prix[number % len(self.grands_prix)],
+                    "official_name": f"{year} Grand Prix {number}",
+                    "qualifying_format": "ONE_SESSION",
+                    "circuit_id": self.circuits[number % len(self.circuits)],
+                    "circuit_type": "RACE",
+                    "course_length": 5.0,
+                    "laps": 60,
+                    "distance": 300.0,
+                }
+            ],
+        )
+
+        grid = entries[:]
+        self.random.shuffle(grid)
+        # the qualifying order is a good predictor of the result
+        result = sorted(
+            enumerate(grid),
+            key=lambda item: item[0] + self.random.gauss(0, len(grid) / 4),
+        )
+        result = [entry for _, entry in result]
+        fastest = self.random.randrange(min(len(result), 6))
+        rows = []
+        for position, (driver, constructor, engine) in enumerate(grid, start=1):
+            rows.append(
+                {
+                    "race_id": race_id,
+                    "type": "QUALIFYING_RESULT",
+                    "position_display_order": position,
+                    "position_number": position,
+                    "position_text": str(position),
+                    "driver_number": self.driver_numbers[driver],
+                    "driver_id": driver,
+                    "constructor_id": constructor,
+                    "engine_manufacturer_id": engine,
+                    "tyre_manufacturer_id": "pirelli",
+                    "qualifying_time_millis": 80_000 + position * 150,
+                    "qualifying_laps": 12,
+                }
+            )
+        grid_positions = {entry: position for position, entry in enumerate(grid, 1)}
+        podium_constructors = set()
+        for position, entry in enumerate(result, start=1):
+            driver, constructor, engine = entry
+            points = float(POINTS[position - 1]) if position <= len(POINTS) else 0.0
+            driver_points[driver] += points
+            constructor_points[constructor] += points
+            total = totals[constructor]
+            total["total_race_entries"] += 1
+            total["total_race_starts"] += 1
+            total["total_race_laps"] += 60
+            if position == 1:
+                total["total_race_wins"] += 1
+            if position <= 3:
+                total["total_podiums"] += 1
+                podium_constructors.add(constructor)
+            if grid_positions[entry] == 1:
+                total["total_pole_positions"] += 1
+            if position - 1 == fastest:
+                total["total_fastest_laps"] += 1
+            total["best_race_result"] = min(
+                total["best_race_result"] or position, position
+            )
+            total["best_starting_grid_position"] = min(
+                total["best_starting_grid_position"] or grid_positions[entry],
+                grid_positions[entry],
+            )
+            rows.append(
+                {
+                    "race_id": race_id,
+                    "type": "RACE_RESULT",
+                    "position_display_order": position,
+                    "position_number": position,
+                    "position_text": str(position),
+                    "driver_number": self.driver_numbers[driver],
+                    "driver_id": driver,
+                    "constructor_id": constructor,
+                    "engine_manufacturer_id": engine,
+                    "tyre_manufacturer_id": "pirelli",
+                    "race_laps": 60,
+                    "race_time_millis": 5_400_000 + position * 1_500,
+                    "race_gap_millis": (position - 1) * 1_500,
+                    "race_points": points,
+                    "race_grid_position_number": grid_positions[entry],
+                    "race_qualification_position_number": grid_positions[entry],
+                    "race_positions_gained": grid_positions[entry] - position,
+                    "race_fastest_lap": position - 1 == fastest,
+                }
+            )
+        if result[0][1] == result[1][1]:
+            totals[result[0][1]]["total_1_and_2_finishes"] += 1
+        for constructor in podium_constructors:
+            totals[constructor]["total_podium_races"] += 1
+        self.insert("race_data", rows)
+
+        self.insert(
+            "race_driver_standing",
+            [
+                {
+                    "race_id": race_id,
+                    "position_display_order": order,
+                    "position_number": number,
+                    "position_text": text,
+                    "driver_id": driver,
+                    "points": points,
+                }
+                for order, number, text, driver, points in _standings(driver_points)
+            ],
+        )
+        engines = {constructor: engine for _, constructor, engine in entries}
+        self.insert(
+            "race_constructor_standing",
+            [
+                {
+                    "race_id": race_id,
+                    "position_display_order": order,
+                    "position_number": number,
+                    "position_text": text,
+                    "constructor_id": constructor,
+                    "engine_manufacturer_id": engines[constructor],
+                    "points": points,
+                }
+                for order, number, text, constructor, points in _standings(
+                    constructor_points
+                )
+            ],
+        )
+
+
+def generate(path, args):
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    engine.dispose()
+
+    connection = sqlite3.connect(path)
+    try:
+        generator = Generator(connection, args)
+        generator.reference_data()
+        for index in range(args.seasons):
+            generator.season(index, args.first_year + index)
+        connection.commit()
+    finally:
+        connection.close()
+    return generator.counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", default="datastore/f1db-synthetic.db")
+    parser.add_argument("--seasons", type=int, default=75)
+    parser.add_argument("--first-year", type=int, default=1950)
+    parser.add_argument("--races", type=int, default=20)
+    parser.add_argument("--constructors", type=int, default=10)
+    parser.add_argument("--drivers-per-constructor", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--force", action="store_true", help="replace --out")
+    args = parser.parse_args()
+
+    if os.path.exists(args.out):
+        if not args.force:
+            parser.error(f"{args.out} exists, use --force to replace it")
+        os.remove(args.out)
+    started = time.perf_counter()
+    counts = generate(args.out, args)
+    print(
+        f"Wrote {args.out} ({os.path.getsize(args.out) / 1024 / 1024:.1f} MiB) "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+    for table, rows in sorted(counts.items()):
+        print(f"  {table:<28} {rows:9d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Teammate battles: a Race_Data self-join vs. app.headtohead.
+
+    python -m benchmarks.headtohead [--repeat 20]
+
+Reports the median time to compute the qualifying and race battles of
+every teammate pair of a season, for every season.
+"""
+
+import argparse
+import time
+
+from sqlalchemy import and_, func
+from sqlalchemy.orm import aliased
+from sqlmodel import select
+
+from app.database import open_db
+from app.headtohead import SESSIONS, build_head_to_head
+from app.models.f1 import Race, Race_Data, Season, Season_Entrant_Driver
+from benchmarks import median_ms
+
+
+def self_join_query(year, type_name, millis_name):
+    # what the endpoint would run per request without the pairwise index
+    first, second = aliased(Race_Data), aliased(Race_Data)
+    first_entry, second_entry = aliased(Season_Entrant_Driver), aliased(
+        Season_Entrant_Driver
+    )
+    gap = getattr(first, millis_name) - getattr(second, millis_name)
+    return (
+        select(
+            first.driver_id,
+            second.driver_id,
+            func.count(),
+            func.sum(first.position_number < second.position_number),
+            func.sum(first.position_number > second.position_number),
+            func.avg(gap),
+        )
+        .join(Race, Race.id == first.race_id)
+        .join(
+            second,
+            and_(
+                second.race_id == first.race_id,
+                second.type == first.type,
+                second.constructor_id == first.constructor_id,
+                second.driver_id > first.driver_id,
+            ),
+        )
+        .join(
+            first_entry,
+            and_(
+                first_entry.year == Race.year,
+                first_entry.driver_id == first.driver_id,
+                first_entry.constructor_id == first.constructor_id,
+            ),
+        )
+        .join(
+            second_entry,
+            and_(
+                second_entry.year == Race.year,
+                second_entry.driver_id == second.driver_id,
+                second_entry.entrant_id == first_entry.entrant_id,
+                second_entry.constructor_id == first_entry.constructor_id,
+            ),
+        )
+        .where(Race.year == year, first.type == type_name)
+        .group_by(first.driver_id, second.driver_id)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with open_db() as db:
+        years = db.exec(select(Season.year)).all()
+        connection = db.connection()
+
+        def self_join():
+            for year in years:
+                for type_name, millis_name in SESSIONS.values():
+                    connection.execute(
+                        self_join_query(year, type_name, millis_name)
+                    ).all()
+
+        started = time.perf_counter()
+        index = build_head_to_head(db)
+        build = (time.perf_counter() - started) * 1000
+
+        def lookup():
+            for year in years:
+                index.season_teammates(year)
+
+        sql = median_ms(self_join, args.repeat)
+        lookups = median_ms(lookup, args.repeat)
+        print(
+            f"{len(years)} seasons: self-join {sql:8.1f} ms  "
+            f"index lookups {lookups:8.1f} ms  {sql / lookups:6.1f}x  "
+            f"(index built in {build:.0f} ms, {len(index)} pair seasons)"
+        )
+
+
+if __name__ == "__main__":
+    main()
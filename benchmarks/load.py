@@ -0,0 +1,221 @@
+"""Latency percentiles and throughput of / and /api/season.
+
+    python -m benchmarks.load [--db datastore/f1db-synthetic.db] [--requests 200]
+        [--concurrency 16] [--duration 10] [--cold] [--compare previous.json]
+
+Requests go through the ASGI app in-process (httpx.ASGITransport), first
+one at a time per endpoint, then from --concurrency clients for --duration
+seconds. Results are written as JSON (--out) to compare runs across
+versions; --cold empties the fragment and chart caches before every
+request to measure rendering instead of cache hits.
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import time
+from pathlib import Path
+
+
+def percentiles(latencies):
+    if len(latencies) < 2:
+        latencies = latencies * 2 or [0.0, 0.0]
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {"p50": cuts[49], "p90": cuts[89], "p99": cuts[98]}
+
+
+def summarize(latencies, elapsed, errors):
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "mean_ms": statistics.fmean(latencies) if latencies else 0.0,
+        **{f"{name}_ms": value for name, value in percentiles(latencies).items()},
+        "max_ms": max(latencies, default=0.0),
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+    }
+
+
+def season_years(path):
+    connection = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+    try:
+        return [year for (year,) in connection.execute("SELECT year FROM season")]
+    finally:
+        connection.close()
+
+
+class Runner:
+    def __init__(self, client, years, cold):
+        self.client = client
+        self.years = years
+        self.cold = cold
+        self._next = 0
+
+    def url(self, endpoint):
+        if endpoint == "/":
+            return "/"
+        self._next += 1
+        return f"/api/season?year={self.years[self._next % len(self.years)]}"
+
+    async def request(self, url):
+        if self.cold:
+            from app.cache import fragment_cache
+            from app.charts import chart_cache
+
+            fragment_cache.invalidate()
+            chart_cache.invalidate()
+        started = time.perf_counter()
+        response = await self.client.get(url)
+        await response.aread()
+        return (time.perf_counter() - started) * 1000, response.status_code >= 400
+
+    async def sequential(self, endpoint, requests):
+        latencies, errors = [], 0
+        started = time.perf_counter()
+        for _ in range(requests):
+            latency, error = await self.request(self.url(endpoint))
+            latencies.append(latency)
+            errors += error
+        return summarize(latencies, time.perf_counter() - started, errors)
+
+    async def concurrent(self, endpoints, concurrency, duration):
+        latencies, errors = [], 0
+        deadline = time.perf_counter() + duration
+
+        async def client(index):
+            nonlocal errors
+            i = index
+            while time.perf_counter() < deadline:
+                latency, error = await self.request(
+                    self.url(endpoints[i % len(endpoints)])
+                )
+                latencies.append(latency)
+                errors += error
+                i += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client(index) for index in range(concurrency)))
+        return summarize(latencies, time.perf_counter() - started, errors)
+
+
+async def run(args):
+    import httpx
+
+    from app.main import app
+
+    years = season_years(args.db)
+    endpoints = ["/", "/api/season"]
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://benchmark"
+        ) as client:
+            runner = Runner(client, years, args.cold)
+            # one pass over every season so warm runs measure cache hits
+            for _ in years:
+                await runner.request(runner.url("/api/season"))
+            sequential = {
+                endpoint: await runner.sequential(endpoint, args.requests)
+                for endpoint in endpoints
+            }
+            concurrent = await runner.concurrent(
+                endpoints, args.concurrency, args.duration
+            )
+    return {"sequential": sequential, "concurrent": concurrent}
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, previous=None):
+    rows = [(f"{name} (sequential)", r) for name, r in results["sequential"].items()]
+    rows.append(("mixed (concurrent)", results["concurrent"]))
+    previous_rows = {}
+    if previous is not None:
+        previous_rows = {
+            f"{name} (sequential)": r for name, r in previous["sequential"].items()
+        }
+        previous_rows["mixed (concurrent)"] = previous["concurrent"]
+    for name, result in rows:
+        line = (
+            f"  {name:<26} p50 {result['p50_ms']:8.2f} ms  "
+            f"p90 {result['p90_ms']:8.2f} ms  p99 {result['p99_ms']:8.2f} ms  "
+            f"{result['rps']:8.1f} req/s  errors {result['errors']}"
+        )
+        before = previous_rows.get(name)
+        if before is not None and before["p50_ms"] and before["rps"]:
+            line += (
+                f"  (p50 {result['p50_ms'] / before['p50_ms'] - 1:+.0%}, "
+                f"req/s {result['rps'] / before['rps'] - 1:+.0%})"
+            )
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=None, help="f1db file (F1STATS_DB_PATH)")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--cold", action="store_true")
+    parser.add_argument("--out", default=None)
+    parser.add_argument("--compare", default=None, help="earlier results JSON")
+    args = parser.parse_args()
+
+    # app.config reads the environment on import
+    if args.db is not None:
+        os.environ["F1STATS_DB_PATH"] = args.db
+    from app import config
+
+    args.db = config.DB_PATH
+    results = {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "db": args.db,
+        "db_bytes": os.path.getsize(args.db),
+        "settings": {
+            name: value
+            for name, value in sorted(os.environ.items())
+            if name.startswith("F1STATS_")
+        },
+        "options": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "cold": args.cold,
+        },
+        **asyncio.run(run(args)),
+    }
+
+    previous = None
+    if args.compare is not None:
+        previous = json.loads(Path(args.compare).read_text())
+    print(f"{args.db} at {results['revision']}{' (cold)' if args.cold else ''}")
+    print_results(results, previous)
+
+    out = Path(
+        args.out
+        or f"benchmarks/results/load-{datetime.datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2))
+    print(f"Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Race_Data pages: OFFSET vs. the keyset cursor of /api/v1/race-data.
+
+    python -m benchmarks.pagination [--limit 100] [--repeat 9]
+
+Reports the median time to read a page at increasing depths with each
+method, and the time to encode one page with pydantic models vs. the
+API's row dicts.
+"""
+
+import argparse
+
+from app.api import RACE_DATA_KEY, dumps, race_data_page_query, records, table_query
+from app.database import open_db
+from app.models.f1 import Race_Data
+from benchmarks import median_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=9)
+    args = parser.parse_args()
+
+    with open_db() as db:
+        connection = db.connection()
+        keys = connection.execute(
+            table_query(Race_Data)
+            .with_only_columns(*RACE_DATA_KEY)
+            .order_by(*RACE_DATA_KEY)
+        ).all()
+        print(f"{len(keys)} Race_Data rows, {args.limit} per page")
+        for fraction in (0, 0.25, 0.5, 0.75, 0.99):
+            depth = int(len(keys) * fraction) // args.limit * args.limit
+            after = tuple(keys[depth - 1]) if depth else None
+
+            def offset():
+                query = (
+                    table_query(Race_Data)
+                    .order_by(*RACE_DATA_KEY)
+                    .offset(depth)
+                    .limit(args.limit)
+                )
+                return connection.execute(query).all()
+
+            def keyset():
+                return connection.execute(race_data_page_query(after, args.limit)).all()
+
+            assert offset() == keyset()
+            offset_ms = median_ms(offset, args.repeat)
+            keyset_ms = median_ms(keyset, args.repeat)
+            print(
+                f"  row {depth:>9}  offset {offset_ms:8.2f} ms  "
+                f"keyset {keyset_ms:8.2f} ms"
+            )
+
+        rows = records(db, race_data_page_query(None, args.limit))
+        models = [Race_Data.model_validate(row) for row in rows]
+        pydantic_ms = median_ms(
+            lambda: dumps([model.model_dump(mode="json") for model in models]),
+            args.repeat,
+        )
+        dicts_ms = median_ms(lambda: dumps(rows), args.repeat)
+        print(
+            f"  encode one page: pydantic {pydantic_ms:.2f} ms  "
+            f"row dicts {dicts_ms:.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
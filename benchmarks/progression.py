@@ -0,0 +1,59 @@
+"""Per-round standings queries vs. app.progression.load_progression.
+
+    python -m benchmarks.progression [--repeat 20]
+
+Reports the median time to build the driver and constructor progression
+of every season, querying round by round and with one query per season.
+"""
+
+import argparse
+
+from sqlmodel import select
+
+from app.database import open_db
+from app.models.f1 import Race, Season
+from app.progression import STANDINGS, load_progression
+from benchmarks import median_ms
+
+
+def per_round(db, year):
+    # what a view built on the per-race standings would do without reshaping
+    connection = db.connection()
+    races = connection.execute(
+        select(Race.id, Race.round).where(Race.year == year).order_by(Race.round)
+    ).all()
+    season = {}
+    for kind, (model, entity) in STANDINGS.items():
+        series = season[kind] = {}
+        for race_id, _ in races:
+            rows = connection.execute(
+                select(entity, model.points, model.position_number).where(
+                    model.race_id == race_id
+                )
+            ).all()
+            for id, points, position in rows:
+                series.setdefault(id, []).append((points, position))
+    return season
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with open_db() as db:
+        years = db.exec(select(Season.year)).all()
+
+        def all_seasons(load):
+            return lambda: [load(db, year) for year in years]
+
+        rounds = median_ms(all_seasons(per_round), args.repeat)
+        arrays = median_ms(all_seasons(load_progression), args.repeat)
+        print(
+            f"{len(years)} seasons: per round {rounds:8.1f} ms  "
+            f"one query per season {arrays:8.1f} ms  {rounds / arrays:6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Full ORM entity loads vs. the column projections in app.queries.
+
+    python -m benchmarks.projections [--year 2024] [--repeat 200]
+
+Reports median latency and allocated bytes for loading one season's data.
+"""
+
+import argparse
+import statistics
+import time
+import tracemalloc
+
+from sqlmodel import select
+
+from app.database import open_db
+from app.models.f1 import (
+    Constructor,
+    Race,
+    Season,
+    Season_Constructor,
+    Season_Constructor_Standing,
+    Season_Driver_Standing,
+    Season_Entrant_Driver,
+)
+from app.queries import fetch_season
+
+
+def fetch_season_entities(db, year):
+    # what read_season used to load: whole rows, validated into SQLModel objects
+    return (
+        db.exec(select(Race).where(Race.year == year).order_by(Race.date)).all(),
+        db.exec(
+            select(Season_Constructor, Constructor.full_name)
+            .join(Constructor, Season_Constructor.constructor_id == Constructor.id)
+            .where(Season_Constructor.year == year)
+            .order_by(Season_Constructor.position_number)
+        ).all(),
+        db.exec(
+            select(Season_Constructor_Standing)
+            .where(Season_Constructor_Standing.year == year)
+            .order_by(Season_Constructor_Standing.position_number)
+        ).all(),
+        db.exec(
+            select(Season_Driver_Standing, Season_Entrant_Driver)
+            .join(
+                Season_Entrant_Driver,
+                Season_Driver_Standing.driver_id == Season_Entrant_Driver.driver_id,
+            )
+            .where(Season_Driver_Standing.year == year)
+            .where(Season_Entrant_Driver.year == year)
+            .order_by(Season_Driver_Standing.position_number)
+        ).all(),
+    )
+
+
+def measure(fetch, year, repeat):
+    timings = []
+    for _ in range(repeat):
+        # a new session per iteration, like one request
+        with open_db() as db:
+            started = time.perf_counter()
+            fetch(db, year)
+            timings.append((time.perf_counter() - started) * 1000)
+
+    with open_db() as db:
+        tracemalloc.start()
+        fetch(db, year)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {"median_ms": statistics.median(timings), "peak_bytes": peak}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--year", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    year = args.year
+    if year is None:
+        with open_db() as db:
+            year = max(db.exec(select(Season.year)).all())
+
+    results = {
+        "entities": measure(fetch_season_entities, year, args.repeat),
+        "projections": measure(fetch_season, year, args.repeat),
+    }
+    print(f"Season {year}, {args.repeat} iterations")
+    for name, result in results.items():
+        print(
+            f"  {name:<12} {result['median_ms']:8.3f} ms  "
+            f"peak {result['peak_bytes'] / 1024:8.1f} KiB"
+        )
+    entities, projections = results["entities"], results["projections"]
+    print(
+        f"  projections: {entities['median_ms'] / projections['median_ms']:.1f}x "
+        f"faster, {entities['peak_bytes'] / projections['peak_bytes']:.1f}x "
+        "less memory"
+    )
+
+
+if __name__ == "__main__":
+    main()
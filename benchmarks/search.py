@@ -0,0 +1,46 @@
+"""Latency of app.search on every keystroke of every indexed name.
+
+    python -m benchmarks.search [--names 200]
+
+Types each of --names names one character at a time and reports latency
+percentiles of SearchIndex.search over all the partial queries.
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from app.database import open_db
+from app.search import search_index_cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--names", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with open_db() as db:
+        started = time.perf_counter()
+        index = search_index_cache.get(db)
+        build = (time.perf_counter() - started) * 1000
+
+    names = [name for _, _, name in index.entries]
+    names = random.Random(args.seed).sample(names, min(args.names, len(names)))
+    queries = [name[:length] for name in names for length in range(1, len(name) + 1)]
+
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        index.search(query)
+        latencies.append((time.perf_counter() - started) * 1000)
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    print(
+        f"{len(index)} names (built in {build:.0f} ms), {len(queries)} queries: "
+        f"p50 {cuts[49]:.3f} ms  p99 {cuts[98]:.3f} ms  max {max(latencies):.3f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import argparse
+
+import pytest
+from sqlmodel import Session, create_engine
+
+from app.headtohead import MAX_YEAR, build_head_to_head
+from benchmarks.fixture import generate
+
+FIXTURE = argparse.Namespace(
+    seasons=3,
+    first_year=1951,
+    races=4,
+    constructors=3,
+    drivers_per_constructor=2,
+    seed=1,
+)
+
+
+@pytest.fixture(scope="module")
+def index(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("f1db") / "f1db.db")
+    generate(path, FIXTURE)
+    engine = create_engine(f"sqlite:///{path}")
+    with Session(engine) as session:
+        yield build_head_to_head(session)
+    engine.dispose()
+
+
+@pytest.fixture
+def drivers(index):
+    return index.drivers.values[0], index.drivers.values[1]
+
+
+def test_compare_finds_meetings(index, drivers):
+    assert index.compare(*drivers)["race"]["meetings"] > 0
+
+
+@pytest.mark.parametrize(
+    "year_from, year_to",
+    [(-1, None), (None, MAX_YEAR + 1), (-(10**9), 10**9)],
+)
+def test_compare_clamps_years(index, drivers, year_from, year_to):
+    assert index.compare(*drivers, year_from, year_to) == index.compare(*drivers)
+
+
+def test_compare_after_last_year(index, drivers):
+    comparison = index.compare(*drivers, year_from=10**9)
+    assert comparison["race"]["meetings"] == 0
+    assert comparison["qualifying"]["meetings"] == 0
@@ -0,0 +1,124 @@
+import argparse
+import sqlite3
+
+import pytest
+from sqlmodel import Session, create_engine
+
+from app.analytics import aggregate, load_race_data
+from app.stats import engine_manufacturer_wins
+from benchmarks.fixture import generate, insert
+
+FIXTURE = argparse.Namespace(
+    seasons=3,
+    first_year=1951,
+    races=4,
+    constructors=3,
+    drivers_per_constructor=2,
+    seed=1,
+)
+
+WINNERS = "FROM race_data WHERE type = 'RACE_RESULT' AND position_number = 1"
+
+
+def add_shared_car(connection, race_id):
+    """Classify the winner's teammate first as well, as f1db does for a shared car."""
+    connection.row_factory = sqlite3.Row
+    winner = dict(
+        connection.execute(f"SELECT * {WINNERS} AND race_id = ?", (race_id,)).fetchone()
+    )
+    (co_driver,) = connection.execute(
+        "SELECT driver_id FROM race_data WHERE race_id = ? AND type = 'RACE_RESULT' "
+        "AND constructor_id = ? AND driver_id != ?",
+        (race_id, winner["constructor_id"], winner["driver_id"]),
+    ).fetchone()
+    (last,) = connection.execute(
+        "SELECT max(position_display_order) FROM race_data "
+        "WHERE race_id = ? AND type = 'RACE_RESULT'",
+        (race_id,),
+    ).fetchone()
+    insert(
+        connection,
+        "race_data",
+        [{**winner, "driver_id": co_driver, "position_display_order": last + 1}],
+    )
+    connection.row_factory = None
+
+
+@pytest.fixture(scope="module")
+def f1db(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("f1db") / "f1db.db")
+    generate(path, FIXTURE)
+    connection = sqlite3.connect(path)
+    add_shared_car(connection, race_id=1)
+    connection.commit()
+    connection.close()
+    return path
+
+
+@pytest.fixture
+def db(f1db):
+    engine = create_engine(f"sqlite:///{f1db}")
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+def races_won(path, by, where=""):
+    connection = sqlite3.connect(path)
+    try:
+        return dict(
+            connection.execute(
+                f"SELECT {by}, count(DISTINCT race_id) {WINNERS} {where} GROUP BY {by}"
+            ).fetchall()
+        )
+    finally:
+        connection.close()
+
+
+def test_fixture_has_shared_car(f1db):
+    connection = sqlite3.connect(f1db)
+    (winners,) = connection.execute(
+        f"SELECT count(*) {WINNERS} AND race_id = 1"
+    ).fetchone()
+    connection.close()
+    assert winners == 2
+
+
+def test_engine_manufacturer_wins_counts_races(f1db, db):
+    wins = {
+        manufacturer: count for count, manufacturer, *_ in engine_manufacturer_wins(db)
+    }
+    assert wins == races_won(f1db, "engine_manufacturer_id")
+    assert sum(wins.values()) == FIXTURE.seasons * FIXTURE.races
+
+
+def test_engine_manufacturer_wins_between_years(f1db, db):
+    year = FIXTURE.first_year + 1
+    wins = {
+        manufacturer: count
+        for count, manufacturer, *_ in engine_manufacturer_wins(db, year, year)
+    }
+    assert wins == races_won(
+        f1db,
+        "engine_manufacturer_id",
+        f"AND race_id IN (SELECT id FROM race WHERE year = {year})",
+    )
+    assert sum(wins.values()) == FIXTURE.races
+
+
+@pytest.mark.parametrize(
+    "by, column",
+    [
+        ("engine_manufacturer", "engine_manufacturer_id"),
+        ("constructor", "constructor_id"),
+    ],
+)
+def test_columnar_wins_count_races(f1db, db, by, column):
+    columns = load_race_data(db)
+    assert dict(aggregate(columns, "wins", by)) == races_won(f1db, column)
+
+
+def test_columnar_wins_credit_both_drivers(f1db, db):
+    columns = load_race_data(db)
+    wins = dict(aggregate(columns, "wins", "driver"))
+    assert sum(wins.values()) == FIXTURE.seasons * FIXTURE.races + 1